@@ -12,15 +12,24 @@
     'data': [
         # Data
         'data/ir_sequence_data.xml',
+        'data/ir_cron_data.xml',
         # Security
         'security/security.xml',
         'security/ir.model.access.csv',
+        # Migrations
+        'data/loan_terms_data.xml',
+        'data/loan_documentation_data.xml',
+        'data/loan_perf_log_data.xml',
         # Views
         'views/res_partner_view.xml',
         'views/loan_manager_requirements_view.xml',
         'views/loan_manager_types_view.xml',
         'views/loan_loans_view.xml',
         'views/loan_dashboard_view.xml',
+        'views/loan_import_view.xml',
+        'views/loan_report_view.xml',
+        'views/loan_accrual_view.xml',
+        'views/loan_perf_log_view.xml',
         'views/account_move_view.xml',
         'views/loan_manager_menu.xml',
     ],
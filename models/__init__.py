@@ -1,4 +1,10 @@
+from . import loans_tracking
 from . import loans_configuration
 from . import loans
 from . import res_partner
-from . import account_move
\ No newline at end of file
+from . import account_move
+from . import loans_import
+from . import account_journal
+from . import loans_report
+from . import loans_accrual
+from . import loans_perf_log
\ No newline at end of file
@@ -0,0 +1,22 @@
+from odoo import models, api
+
+
+class AccountJournal(models.Model):
+    _inherit = 'account.journal'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        journals = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return journals
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'type', 'company_id', 'active', 'sequence'} & set(vals):
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
@@ -5,6 +5,7 @@ class AccountMove(models.Model):
     _inherit = 'account.move'
 
     loan_manager_id = fields.Many2one('loan.manager.loan', string='Préstamo', copy=False, readonly=True)
+    loan_collection_batch = fields.Boolean(string='Cobros Consolidados de Préstamos', copy=False, readonly=True, index=True)
 
     def write(self, vals):
         if 'loan_manager_id' in vals:
@@ -20,4 +21,10 @@ class AccountMove(models.Model):
             'res_model': 'loan.manager.loan',
             'view_mode': 'form',
             'res_id': self.loan_manager_id.id,
-        }
\ No newline at end of file
+        }
+
+
+class AccountMoveLine(models.Model):
+    _inherit = 'account.move.line'
+
+    loan_repayment_id = fields.Many2one('loan.manager.repayment', string='Cuota de Préstamo', copy=False, readonly=True, index='btree_not_null')
@@ -1,6 +1,11 @@
 import math
+import time
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from odoo.tools import sql, html_escape
+from ..tools import amortization
+from ..tools.instrumentation import instrumented
+from .loans_configuration import ACCOUNT_TERMS_FIELDS
 
 # Define your models here.
 
@@ -13,11 +18,11 @@ class Loan(models.Model):
     _name = 'loan.manager.loan'
     _description = 'Loan'
     _rec_name = 'reference'
-    _inherit = ['mail.thread']
+    _inherit = ['mail.thread', 'loan.manager.bulk.tracking.mixin']
 
     reference = fields.Char(string='Referencia', readonly=True, copy=False, default=lambda self: _('New'), tracking=True)
-    partner_id = fields.Many2one('res.partner', string='Cliente', required=True, tracking=True)
-    loan_type_id = fields.Many2one('loan.manager.type', string='Tipo de Prestamo', required=True, tracking=True)
+    partner_id = fields.Many2one('res.partner', string='Cliente', required=True, tracking=True, index=True)
+    loan_type_id = fields.Many2one('loan.manager.type', string='Tipo de Prestamo', required=True, tracking=True, index=True)
     loan_amount = fields.Float(string='Monto', required=True, tracking=True)
     tenure_plan = fields.Selection([
         ('monthly', 'Mensual'),
@@ -31,8 +36,8 @@ class Loan(models.Model):
     ], string='Método de Amortización')
     interest_rate = fields.Float(string='Tasa de Interes (%)', tracking=True)
     disburse_amount = fields.Float(string='Monto a Desembolsar', readonly=True)
-    amount_paid = fields.Float(string="Monto Pagado", compute="_compute_paid_pending", store=False, readonly=True)
-    amount_pending = fields.Float(string="Monto Pendiente", compute="_compute_paid_pending", store=False, readonly=True)
+    amount_paid = fields.Float(string="Total Cobrado", compute="_compute_paid_pending", store=True, readonly=True, help="Capital, intereses y cargos por mora cobrados en las cuotas pagadas total o parcialmente.")
+    amount_pending = fields.Float(string="Saldo por Cobrar", compute="_compute_paid_pending", store=True, readonly=True, help="Capital, intereses y cargos por mora de las cuotas pendientes, incluidas las cuotas proyectadas.")
     documents_required = fields.Many2many(
         comodel_name='loan.manager.requirement',
         string='Documentos Requeridos',
@@ -48,12 +53,15 @@ class Loan(models.Model):
         ('registered', 'Contabilizado'),
         ('disbursed', 'Desembolsado'),
         ('declined', 'Denegado')
-    ], required=True, default='draft', readonly=True, tracking=True)
+    ], required=True, default='draft', readonly=True, tracking=True, index=True)
     uploaded_documents = fields.One2many(
         'loan.manager.documentation',
         'loan_id',
         string='Documentos Cargados'
     )
+    documents_mandatory_count = fields.Integer(string='Documentos Obligatorios', compute='_compute_documents_counts', store=True)
+    documents_presented_count = fields.Integer(string='Documentos Obligatorios Presentados', compute='_compute_documents_counts', store=True)
+    documents_missing_count = fields.Integer(string='Documentos Faltantes', compute='_compute_documents_counts', store=True, index=True)
     rejection_reason = fields.Text(string="Motivo de Rechazo", readonly=True, tracking=True)
     # Expenses Data
     disburse_commission = fields.Float(string='Comisión por Desembolso (%)')
@@ -62,83 +70,99 @@ class Loan(models.Model):
     legal_expenses = fields.Float(string='Gastos Legales')
     life_insurance = fields.Float(string='Seguro de Vida')
     # Accounts Data
-    loan_account_number = fields.Many2one('account.account', string='Cuenta por Cobrar Cliente', tracking=True)
-    interest_account_number = fields.Many2one('account.account', string='Cuenta de Interés', tracking=True)
-    life_insurance_account_number = fields.Many2one('account.account', string='Cuenta de Seguro de Vida', tracking=True)
-    disburse_account_number = fields.Many2one('account.account', string='Cuenta Provisión de Desembolso', tracking=True)
-    disburse_bank_account_number = fields.Many2one('account.account', string='Cuenta Bancaria de Desembolso', tracking=True)
-    payment_account_number = fields.Many2one('account.account', string='Cuenta de Cuotas', tracking=True)
-    legal_expenses_account_number = fields.Many2one('account.account', string='Cuenta de Gastos Legales', tracking=True)
-    anticipated_payment_commission_account_number = fields.Many2one('account.account', string='Cuenta de Comisión por Pago Anticipado', tracking=True)
-    disburse_commission_account_number = fields.Many2one('account.account', string='Cuenta de Comisión por Desembolso', tracking=True)
+    terms_id = fields.Many2one('loan.manager.terms', string='Términos', readonly=True, copy=False, index=True, ondelete='restrict')
+    loan_account_number = fields.Many2one(related='terms_id.loan_account', string='Cuenta por Cobrar Cliente')
+    interest_account_number = fields.Many2one(related='terms_id.interest_account', string='Cuenta de Interés')
+    life_insurance_account_number = fields.Many2one(related='terms_id.life_insurance_account', string='Cuenta de Seguro de Vida')
+    disburse_account_number = fields.Many2one(related='terms_id.disburse_account', string='Cuenta Provisión de Desembolso')
+    disburse_bank_account_number = fields.Many2one(related='terms_id.disburse_bank_account', string='Cuenta Bancaria de Desembolso')
+    payment_account_number = fields.Many2one(related='terms_id.payment_account', string='Cuenta de Cuotas')
+    legal_expenses_account_number = fields.Many2one(related='terms_id.legal_expenses_account', string='Cuenta de Gastos Legales')
+    anticipated_payment_commission_account_number = fields.Many2one(related='terms_id.anticipated_payment_commission_account', string='Cuenta de Comisión por Pago Anticipado')
+    disburse_commission_account_number = fields.Many2one(related='terms_id.disburse_commission_account', string='Cuenta de Comisión por Desembolso')
     register_move_id = fields.Many2one('account.move', string='Asiento de Registro', readonly=True, copy=False)
     disburse_move_id = fields.Many2one('account.move', string='Asiento de Desembolso', readonly=True, copy=False)
+    settlement_move_id = fields.Many2one('account.move', string='Asiento de Cancelación', readonly=True, copy=False)
     # Related Data
-    company_id = fields.Many2one('res.company', readonly=True, copy=False, default=lambda self: self.env.company)
+    company_id = fields.Many2one('res.company', readonly=True, copy=False, default=lambda self: self.env.company, index=True)
     loan_repayment_ids = fields.One2many('loan.manager.repayment', 'loan_id', string='Cuotas Generadas')
     create_date_only = fields.Date(string="Fecha de Creación", compute="_compute_create_date_only", store=True)
     interest_rate_display = fields.Char(string='Tasa de Interes (%)', compute='_compute_interest_rate_display', store=False)
     repayments_dirty = fields.Boolean(default=False)
+    next_repayment_id = fields.Many2one('loan.manager.repayment', string='Próxima Cuota', compute='_compute_next_repayment', store=True, readonly=True)
+    next_due_date = fields.Date(related='next_repayment_id.due_date', string='Próximo Vencimiento', store=True)
+    projected_schedule = fields.Json(string='Plan Proyectado', readonly=True, copy=False, help='Cuotas futuras aún no creadas, guardadas como una lista por columna del plan de pagos.')
+    projected_principal = fields.Float(string='Capital Proyectado', compute='_compute_projected_schedule', store=True)
+    projected_next_due_date = fields.Date(string='Próxima Cuota Proyectada', compute='_compute_projected_schedule', store=True, index=True)
+    projected_schedule_html = fields.Html(string='Cuotas Proyectadas', compute='_compute_projected_schedule_html', sanitize=False)
 
     @api.model_create_multi
     def create(self, vals_list):
+        LoanType = self.env['loan.manager.type']
+        loan_types = LoanType.browse({vals['loan_type_id'] for vals in vals_list if vals.get('loan_type_id')})
+        loan_types_by_id = {loan_type.id: loan_type for loan_type in loan_types}
         for vals in vals_list:
             if vals.get('reference', _('New')) == _('New'):
                 vals['reference'] = self.env['ir.sequence'].next_by_code('loan.manager.loan') or _('New')
-            loan_type_id = vals.get('loan_type_id')
-            if loan_type_id:
-                loan_type = self.env['loan.manager.type'].browse(loan_type_id)
-                if loan_type:
-                    vals.update({
-                        'interest_rate': loan_type.interest_rate,
-                        'disburse_commission': loan_type.disburse_commission,
-                        'anticipated_payment_commission': loan_type.anticipated_payment_commission,
-                        'legal_expenses': loan_type.legal_expenses,
-                        'life_insurance': loan_type.life_insurance,
-                        'loan_account_number': loan_type.loan_account.id,
-                        'interest_account_number': loan_type.interest_account.id,
-                        'life_insurance_account_number': loan_type.life_insurance_account.id,
-                        'disburse_account_number': loan_type.disburse_account.id,
-                        'payment_account_number': loan_type.payment_account.id,
-                        'legal_expenses_account_number': loan_type.legal_expenses_account.id,
-                        'anticipated_payment_commission_account_number': loan_type.anticipated_payment_commission_account.id,
-                        'disburse_commission_account_number': loan_type.disburse_commission_account.id,
-                        'disburse_bank_account_number': loan_type.disburse_bank_account.id,
-                        'amortization_method': (loan_type.amortization_method or '') if loan_type.amortization_method else '',
-                        'tenure_plan': (loan_type.tenure_plan or '') if loan_type.tenure_plan else '',
-                    })
-            self._validate_loan_constraints(vals)
+            loan_type = loan_types_by_id.get(vals.get('loan_type_id'), LoanType)
+            if loan_type:
+                vals.update(loan_type._get_loan_terms_vals())
+            self._validate_loan_constraints(vals, loan_type)
         return super().create(vals_list)
 
     def write(self, vals):
-        for record in self:
-            if vals.get('loan_amount') or vals.get('tenure') or vals.get('interest_rate'):
-                vals['repayments_dirty'] = True
-            updated_vals = vals.copy()
-            loan_type_id = updated_vals.get('loan_type_id') or record.loan_type_id.id
-            loan_type = self.env['loan.manager.type'].browse(loan_type_id)
-            if loan_type:
-                updated_vals.update({
-                    'interest_rate': loan_type.interest_rate,
-                    'disburse_commission': loan_type.disburse_commission,
-                    'anticipated_payment_commission': loan_type.anticipated_payment_commission,
-                    'legal_expenses': loan_type.legal_expenses,
-                    'life_insurance': loan_type.life_insurance,
-                    'loan_account_number': loan_type.loan_account.id,
-                    'interest_account_number': loan_type.interest_account.id,
-                    'life_insurance_account_number': loan_type.life_insurance_account.id,
-                    'disburse_account_number': loan_type.disburse_account.id,
-                    'payment_account_number': loan_type.payment_account.id,
-                    'legal_expenses_account_number': loan_type.legal_expenses_account.id,
-                    'anticipated_payment_commission_account_number': loan_type.anticipated_payment_commission_account.id,
-                    'disburse_commission_account_number': loan_type.disburse_commission_account.id,
-                    'disburse_bank_account_number': loan_type.disburse_bank_account.id,
-                    'amortization_method': (loan_type.amortization_method or '') if loan_type.amortization_method else '',
-                    'tenure_plan': (loan_type.tenure_plan or '') if loan_type.tenure_plan else '',
-                })
-            record._validate_loan_constraints(updated_vals)
-            super().write(vals)
-        return True
+        if self._is_bulk_tracking_write():
+            return self._write_with_bulk_tracking(vals)
+        if vals.get('loan_amount') or vals.get('tenure') or vals.get('interest_rate'):
+            vals['repayments_dirty'] = True
+        if vals.get('loan_type_id'):
+            loan_types = self.env['loan.manager.type'].browse(vals['loan_type_id'])
+            vals['terms_id'] = loan_types._get_terms().id
+        else:
+            loan_types = self.loan_type_id
+        for loan_type in loan_types:
+            self._validate_loan_constraints(vals, loan_type)
+        return super().write(vals)
+
+    @api.model
+    def _migrate_terms_snapshots(self):
+        # Loans created before terms snapshots existed still carry the account columns they copied from their
+        # type. One snapshot is created per distinct combination so every loan keeps the accounts it used.
+        cr = self.env.cr
+        self.env['loan.manager.type'].sudo().with_context(active_test=False).search([('terms_id', '=', False)])._sync_terms()
+        account_columns = [f'{name}_number' for name in ACCOUNT_TERMS_FIELDS]
+        legacy_columns = [column for column in account_columns if sql.column_exists(cr, self._table, column)]
+        if legacy_columns:
+            Terms = self.env['loan.manager.terms'].sudo()
+            cr.execute(f"""
+                SELECT loan_type_id, {', '.join(legacy_columns)}, ARRAY_AGG(id)
+                  FROM {self._table}
+                 WHERE terms_id IS NULL AND loan_type_id IS NOT NULL
+              GROUP BY loan_type_id, {', '.join(legacy_columns)}
+            """)
+            for row in cr.fetchall():
+                loan_type = self.env['loan.manager.type'].sudo().browse(row[0])
+                accounts = {column[:-len('_number')]: value for column, value in zip(legacy_columns, row[1:-1])}
+                current = loan_type.terms_id
+                values = current._get_terms_values()
+                if any(values[name] != (value or False) for name, value in accounts.items()):
+                    current = Terms.create(dict(
+                        values,
+                        **{name: value or False for name, value in accounts.items()},
+                        loan_type_id=loan_type.id,
+                        company_id=loan_type.company_id.id,
+                        version=loan_type._get_next_terms_version(),
+                    ))
+                cr.execute(f"UPDATE {self._table} SET terms_id = %s WHERE id = ANY(%s)", [current.id, row[-1]])
+            for column in legacy_columns:
+                cr.execute(f'ALTER TABLE {self._table} DROP COLUMN "{column}"')
+        cr.execute(f"""
+            UPDATE {self._table} loan
+               SET terms_id = loan_type.terms_id
+              FROM loan_manager_type loan_type
+             WHERE loan.loan_type_id = loan_type.id AND loan.terms_id IS NULL
+        """)
+        self.invalidate_model(['terms_id'])
 
     # Automatic Calculations
     @api.depends('loan_type_id')
@@ -151,6 +175,15 @@ class Loan(models.Model):
                 else empty_recordset
             )
 
+    @api.depends('documents_required.mandatory', 'uploaded_documents.requirement_id', 'uploaded_documents.file')
+    def _compute_documents_counts(self):
+        for record in self:
+            mandatory = record.documents_required.filtered(lambda r: r.mandatory)
+            presented = record.uploaded_documents.with_context(bin_size=True).filtered(lambda d: d.file).requirement_id & mandatory
+            record.documents_mandatory_count = len(mandatory)
+            record.documents_presented_count = len(presented)
+            record.documents_missing_count = len(mandatory) - len(presented)
+
     @api.depends('create_date')
     def _compute_create_date_only(self):
         for record in self:
@@ -161,24 +194,80 @@ class Loan(models.Model):
         for record in self:
             record.interest_rate_display = f"{record.interest_rate:.2f}%"
 
-    @api.depends('loan_repayment_ids.status', 'loan_repayment_ids.principal', 'loan_repayment_ids.interest', 'loan_repayment_ids.amount_paid')
+    @api.depends('loan_status', 'projected_schedule', 'loan_repayment_ids.status', 'loan_repayment_ids.total_payment', 'loan_repayment_ids.amount_paid', 'loan_repayment_ids.late_fee')
     def _compute_paid_pending(self):
+        # Both totals are cash amounts: the installment with its late fee, or what was actually received for a
+        # partial payment, which covers the late fee first.
+        totals = {}
+        disbursed_ids = [loan._origin.id for loan in self if loan.loan_status == 'disbursed' and loan._origin.id]
+        if disbursed_ids:
+            groups = self.env['loan.manager.repayment']._read_group(
+                [('loan_id', 'in', disbursed_ids)],
+                ['loan_id', 'status'],
+                ['total_payment:sum', 'amount_paid:sum', 'late_fee:sum'],
+            )
+            for loan, status, total_payment, amount_paid, late_fee in groups:
+                paid_total, pending_total = totals.get(loan.id, (0.0, 0.0))
+                if status == 'paid':
+                    paid_total += (total_payment or 0.0) + (late_fee or 0.0)
+                elif status == 'partial':
+                    paid_total += amount_paid or 0.0
+                elif status in ['pending', 'extra']:
+                    pending_total += (total_payment or 0.0) + (late_fee or 0.0)
+                totals[loan.id] = (paid_total, pending_total)
         for loan in self:
             if loan.loan_status != 'disbursed':
                 loan.amount_paid = 0.0
                 loan.amount_pending = 0.0
                 continue
-            paid_total = 0.0
-            pending_total = 0.0
-            for repayment in loan.loan_repayment_ids:
-                if repayment.status == 'paid':
-                    paid_total += (repayment.principal or 0.0)
-                elif repayment.status == 'partial':
-                    paid_total += repayment.amount_paid or 0.0
-                elif repayment.status in ['pending', 'extra']:
-                    pending_total += (repayment.principal or 0.0)
-            loan.amount_paid = paid_total
-            loan.amount_pending = pending_total
+            amount_paid, amount_pending = totals.get(loan._origin.id, (0.0, 0.0))
+            schedule = loan.projected_schedule or {}
+            loan.amount_paid = amount_paid
+            loan.amount_pending = amount_pending + sum(schedule.get('principal') or []) + sum(schedule.get('interest') or [])
+
+    @api.depends('projected_schedule')
+    def _compute_projected_schedule(self):
+        for loan in self:
+            schedule = loan.projected_schedule or {}
+            loan.projected_principal = round(sum(schedule.get('principal') or []), 2)
+            loan.projected_next_due_date = (schedule.get('due_date') or [False])[0]
+
+    @api.depends('projected_schedule')
+    def _compute_projected_schedule_html(self):
+        for loan in self:
+            rows = loan._get_projected_rows()
+            if not rows:
+                loan.projected_schedule_html = False
+                continue
+            loan.projected_schedule_html = (
+                "<table class='table table-sm o_list_table'><thead><tr><th>Cuota</th><th>Fecha de Pago</th>"
+                "<th class='text-end'>Capital</th><th class='text-end'>Interés</th><th class='text-end'>Pago Total</th>"
+                "<th class='text-end'>Saldo Restante</th></tr></thead><tbody>"
+                + ''.join(
+                    f"<tr><td>{row['sequence']}</td><td>{row['due_date']}</td><td class='text-end'>{row['principal']:,.2f}</td>"
+                    f"<td class='text-end'>{row['interest']:,.2f}</td><td class='text-end'>{row['principal'] + row['interest']:,.2f}</td>"
+                    f"<td class='text-end'>{row['remaining_balance']:,.2f}</td></tr>"
+                    for row in rows
+                )
+                + "</tbody></table>"
+            )
+
+    @api.depends('loan_repayment_ids.status', 'loan_repayment_ids.sequence')
+    def _compute_next_repayment(self):
+        Repayment = self.env['loan.manager.repayment']
+        next_ids = {}
+        loan_ids = [loan_id for loan_id in self._origin.ids if loan_id]
+        if loan_ids:
+            Repayment.flush_model(['loan_id', 'status', 'sequence'])
+            self.env.cr.execute("""
+                SELECT DISTINCT ON (loan_id) loan_id, id
+                  FROM loan_manager_repayment
+                 WHERE loan_id = ANY(%s) AND status IN ('pending', 'extra')
+              ORDER BY loan_id, sequence, id
+            """, [loan_ids])
+            next_ids = dict(self.env.cr.fetchall())
+        for loan in self:
+            loan.next_repayment_id = Repayment.browse(next_ids.get(loan._origin.id))
 
     @api.depends('loan_type_id.amortization_method')
     def _compute_method_display(self):
@@ -223,11 +312,12 @@ class Loan(models.Model):
             self.tenure_plan = self.loan_type_id.tenure_plan
 
     # Validations
-    def _validate_loan_constraints(self, vals):
+    def _validate_loan_constraints(self, vals, loan_type=None):
         tenure = vals.get('tenure')
         loan_amount = vals.get('loan_amount')
-        loan_type_id = vals.get('loan_type_id') or self.loan_type_id.id
-        loan_type = self.env['loan.manager.type'].browse(loan_type_id) if loan_type_id else None
+        if loan_type is None:
+            loan_type_id = vals.get('loan_type_id') or self.loan_type_id.id
+            loan_type = self.env['loan.manager.type'].browse(loan_type_id) if loan_type_id else None
         if tenure is not None:
             if tenure <= 0:
                 raise ValidationError("El plazo debe ser mayor que cero.")
@@ -251,10 +341,98 @@ class Loan(models.Model):
             total_deductions = disbursed_commission_amount + record.legal_expenses + record.life_insurance
             record.disburse_amount = record.loan_amount - total_deductions
 
+    def _get_schedule_terms(self):
+        terms = []
+        for loan in self:
+            if (loan.tenure or 0) <= 0:
+                raise ValidationError('El plazo debe ser mayor que 0.')
+            terms.append({
+                'principal': loan.loan_amount or 0.0,
+                'periods': loan.tenure,
+                'annual_rate': loan.interest_rate or 0.0,
+                'start_date': loan.create_date_only or fields.Date.today(),
+                'method': loan.loan_type_id.amortization_method or 'french',
+            })
+        return terms
+
+    def _generate_repayments(self):
+        if not self:
+            return
+        Repayment = self.env['loan.manager.repayment']
+        schedules = amortization.build_schedules(self._get_schedule_terms())
+        compact = self.filtered(lambda loan: loan.loan_type_id.schedule_storage == 'compact')
+        Repayment.search([('loan_id', 'in', self.ids)]).unlink()
+        Repayment.create([
+            dict(row, loan_id=loan.id)
+            for loan, schedule in zip(self, schedules) if loan not in compact
+            for row in schedule.rows()
+        ])
+        (self - compact).filtered('projected_schedule').write({'projected_schedule': False})
+        for loan, schedule in zip(self, schedules):
+            if loan in compact:
+                loan.projected_schedule = dict(
+                    zip(schedule._fields, schedule),
+                    due_date=[fields.Date.to_string(due_date) for due_date in schedule.due_date],
+                )
+        self.write({'repayments_dirty': False})
+        compact._materialize_installments()
+
+    def _get_projected_rows(self):
+        self.ensure_one()
+        schedule = self.projected_schedule or {}
+        columns = amortization.Schedule._fields
+        return [
+            dict(zip(columns, values), due_date=fields.Date.to_date(values[1]))
+            for values in zip(*(schedule.get(column) or [] for column in columns))
+        ]
+
+    def _set_projected_rows(self, rows):
+        self.ensure_one()
+        self.projected_schedule = {
+            column: [fields.Date.to_string(row[column]) if column == 'due_date' else row[column] for row in rows]
+            for column in amortization.Schedule._fields
+        } if rows else False
+
+    def _materialize_installments(self, until_date=None, up_to=None):
+        # Projected installments are turned into repayment rows once they are due by until_date, or up to installment
+        # number up_to when a payment targets them. A loan always keeps its next installment as a row, so payments,
+        # overdue detection and accruals keep working on rows.
+        loans = self.filtered('projected_schedule')
+        if not loans:
+            return
+        Repayment = self.env['loan.manager.repayment']
+        first_pending = {
+            loan.id: sequence for loan, sequence in Repayment._read_group(
+                [('loan_id', 'in', loans.ids), ('status', 'in', ['pending', 'extra'])], ['loan_id'], ['sequence:min'],
+            )
+        }
+        vals_list = []
+        for loan in loans:
+            rows = loan._get_projected_rows()
+            count = 0
+            while count < len(rows) and (
+                (until_date and rows[count]['due_date'] <= until_date) or (up_to and rows[count]['sequence'] <= up_to)
+            ):
+                count += 1
+            if not count and first_pending.get(loan.id, rows[0]['sequence'] + 1) > rows[0]['sequence']:
+                count = 1
+            if not count:
+                continue
+            vals_list += [dict(row, loan_id=loan.id) for row in rows[:count]]
+            loan._set_projected_rows(rows[count:])
+        Repayment.create(vals_list)
+
+    @api.model
+    def _cron_materialize_installments(self):
+        lead_days = int(self.env['ir.config_parameter'].sudo().get_param('tel_capp_lm.materialize_lead_days', 30))
+        until_date = fields.Date.add(fields.Date.context_today(self), days=lead_days)
+        loans = self.search([('loan_status', '=', 'disbursed'), ('projected_next_due_date', '<=', until_date)])
+        loans._materialize_installments(until_date)
+
+    @instrumented
     def _register_loan(self):
         Account = self.env['account.account']
         Move = self.env['account.move']
-        Journal = self.env['account.journal']
 
         for loan in self:
             loan_account = loan.loan_account_number
@@ -299,11 +477,7 @@ class Loan(models.Model):
                         'credit': amount,
                     }))
 
-            journal = Journal.search([
-                ('type', '=', 'general'),
-                ('company_id', '=', loan.company_id.id)
-            ], limit=1)
-
+            journal = loan.loan_type_id._get_loan_journal('register', loan.company_id)
             if not journal:
                 raise ValidationError(f"No existe un diario general en la empresa {loan.company_id.name}.")
 
@@ -320,10 +494,10 @@ class Loan(models.Model):
             move.action_post()
             loan.write({'register_move_id': move.id})
 
+    @instrumented
     def _disburse_loan(self):
         Account = self.env['account.account']
         Move = self.env['account.move']
-        Journal = self.env['account.journal']
 
         for loan in self:
             if loan.disburse_amount <= 0:
@@ -363,13 +537,7 @@ class Loan(models.Model):
                 }),
             ]
 
-            journal = Journal.search([
-                ('type', 'in', ('bank', 'cash')),
-                ('company_id', '=', loan.company_id.id),
-            ], limit=1) or Journal.search([
-                ('type', '=', 'general'),
-                ('company_id', '=', loan.company_id.id),
-            ], limit=1)
+            journal = loan.loan_type_id._get_loan_journal('disburse', loan.company_id)
             if not journal:
                 raise ValidationError(f"No existe un diario para registrar el desembolso en {loan.company_id.name}.")
 
@@ -385,116 +553,239 @@ class Loan(models.Model):
             move.action_post()
             loan.write({'disburse_move_id': move.id})
 
+    def _get_payoff_quotes(self, payoff_date=None):
+        # Quotes come from the stored schedule: the pending principal, the interest of installments already due, the
+        # anticipated payment commission over the principal paid before its due date and the unpaid late fees.
+        payoff_date = payoff_date or fields.Date.context_today(self)
+        quotes = {
+            loan_id: {'installments': 0, 'principal': 0.0, 'interest': 0.0, 'commission': 0.0, 'late_fee': 0.0, 'total': 0.0}
+            for loan_id in self.ids
+        }
+        if not quotes:
+            return quotes
+        self.flush_model(['loan_status', 'anticipated_payment_commission'])
+        self.env['loan.manager.repayment'].flush_model(['loan_id', 'status', 'due_date', 'principal', 'interest', 'late_fee'])
+        self.env.cr.execute("""
+            SELECT r.loan_id,
+                   COUNT(*),
+                   SUM(r.principal),
+                   COALESCE(SUM(r.interest) FILTER (WHERE r.due_date <= %(date)s), 0.0),
+                   COALESCE(SUM(r.principal) FILTER (WHERE r.due_date > %(date)s), 0.0)
+                       * COALESCE(l.anticipated_payment_commission, 0.0) / 100.0,
+                   COALESCE(SUM(r.late_fee), 0.0)
+              FROM loan_manager_repayment r
+              JOIN loan_manager_loan l ON l.id = r.loan_id
+             WHERE r.loan_id = ANY(%(loan_ids)s)
+               AND l.loan_status = 'disbursed'
+               AND r.status IN ('pending', 'extra')
+          GROUP BY r.loan_id, l.anticipated_payment_commission
+        """, {'date': payoff_date, 'loan_ids': self.ids})
+        totals = {row[0]: list(row[1:]) for row in self.env.cr.fetchall()}
+        # Installments of compact schedules that are not materialized yet are quoted from the projection.
+        for loan in self.filtered(lambda loan: loan.projected_schedule and loan.loan_status == 'disbursed'):
+            installments, principal, interest, commission, late_fee = totals.setdefault(loan.id, [0, 0.0, 0.0, 0.0, 0.0])
+            for row in loan._get_projected_rows():
+                installments += 1
+                principal += row['principal']
+                if row['due_date'] <= payoff_date:
+                    interest += row['interest']
+                else:
+                    commission += row['principal'] * (loan.anticipated_payment_commission or 0.0) / 100.0
+            totals[loan.id] = [installments, principal, interest, commission, late_fee]
+        for loan_id, (installments, principal, interest, commission, late_fee) in totals.items():
+            principal, interest, commission, late_fee = round(principal, 2), round(interest, 2), round(commission, 2), round(late_fee, 2)
+            quotes[loan_id] = {
+                'installments': installments,
+                'principal': principal,
+                'interest': interest,
+                'commission': commission,
+                'late_fee': late_fee,
+                'total': round(principal + interest + commission + late_fee, 2),
+            }
+        return quotes
+
+    @instrumented
+    def _settle_loans(self, payment_date=None):
+        payment_date = payment_date or fields.Date.context_today(self)
+        quotes = self._get_payoff_quotes(payment_date)
+        projected_by_loan = {loan.id: loan._get_projected_rows() for loan in self if loan.projected_schedule}
+        Move = self.env['account.move']
+        Repayment = self.env['loan.manager.repayment'].with_context(loan_reamortization=True)
+        remaining_by_loan = {}
+        for repayment in Repayment.search([('loan_id', 'in', self.ids), ('status', 'in', ['pending', 'extra'])]):
+            remaining_by_loan.setdefault(repayment.loan_id.id, []).append(repayment.id)
+
+        for loan in self:
+            quote = quotes[loan.id]
+            if not quote['installments']:
+                raise ValidationError(f"El préstamo {loan.reference} no tiene cuotas pendientes para cancelar.")
+            accounts = {
+                'payment_account_number': quote['total'],
+                'loan_account_number': quote['principal'] + quote['late_fee'],
+                'interest_account_number': quote['interest'],
+                'anticipated_payment_commission_account_number': quote['commission'],
+            }
+            for acct_field, amount in accounts.items():
+                if amount > 0 and not getattr(loan, acct_field):
+                    raise ValidationError(f"Falta la cuenta para {acct_field}.")
+
+            lines = [(0, 0, {
+                'name': f'Cancelación {loan.reference}',
+                'account_id': loan.payment_account_number.id,
+                'debit': quote['total'],
+                'credit': 0.0,
+            })]
+            if quote['principal'] > 0:
+                lines.append((0, 0, {
+                    'name': f'Capital cancelación {loan.reference}',
+                    'account_id': loan.loan_account_number.id,
+                    'partner_id': loan.partner_id.id,
+                    'debit': 0.0,
+                    'credit': quote['principal'],
+                }))
+            if quote['late_fee'] > 0:
+                lines.append((0, 0, {
+                    'name': f'Cargos por mora cancelación {loan.reference}',
+                    'account_id': loan.loan_account_number.id,
+                    'partner_id': loan.partner_id.id,
+                    'debit': 0.0,
+                    'credit': quote['late_fee'],
+                }))
+            if quote['interest'] > 0:
+                lines.append((0, 0, {
+                    'name': f'Interés cancelación {loan.reference}',
+                    'account_id': loan.interest_account_number.id,
+                    'debit': 0.0,
+                    'credit': quote['interest'],
+                }))
+            if quote['commission'] > 0:
+                lines.append((0, 0, {
+                    'name': f'Comisión por pago anticipado {loan.reference}',
+                    'account_id': loan.anticipated_payment_commission_account_number.id,
+                    'debit': 0.0,
+                    'credit': quote['commission'],
+                }))
+
+            journal = loan.loan_type_id._get_loan_journal('payment', loan.company_id)
+            if not journal:
+                raise ValidationError(f"No se encontró un diario para la empresa {loan.company_id.name}.")
+
+            move = Move.create({
+                'ref': f'Cancelación anticipada {loan.reference}',
+                'date': payment_date,
+                'journal_id': journal.id,
+                'company_id': loan.company_id.id,
+                'currency_id': loan.company_id.currency_id.id,
+                'loan_manager_id': loan.id,
+                'line_ids': lines,
+            })
+            move.action_post()
+
+            remaining = Repayment.browse(remaining_by_loan.get(loan.id, []))
+            remaining.filtered(lambda repayment: repayment.due_date > payment_date).write({'interest': 0.0})
+            remaining.write({'status': 'paid', 'move_id': move.id, 'payment_date': payment_date})
+            # Projected installments are settled straight from the compact schedule, as one paid row.
+            projected = projected_by_loan.get(loan.id)
+            if projected:
+                Repayment.create({
+                    'loan_id': loan.id,
+                    'sequence': projected[0]['sequence'],
+                    'due_date': payment_date,
+                    'principal': round(sum(row['principal'] for row in projected), 2),
+                    'interest': round(sum(row['interest'] for row in projected if row['due_date'] <= payment_date), 2),
+                    'remaining_balance': 0.0,
+                    'status': 'paid',
+                    'move_id': move.id,
+                    'payment_date': payment_date,
+                })
+                loan.projected_schedule = False
+            loan.write({'settlement_move_id': move.id})
+
     # Button Actions
+    @instrumented
     def action_calculate_repayments(self):
-        for loan in self:
-            self.env['loan.manager.repayment'].search([('loan_id', '=', loan.id)]).unlink()
-            principal = loan.loan_amount or 0.0
-            months = loan.tenure or 0
-            if months <= 0:
-                raise ValidationError('El plazo debe ser mayor que 0.')
-            rate = ((loan.interest_rate or 0.0) / 100.0) / 12.0
-            start_date = loan.create_date_only or fields.Date.today()
-            method = loan.loan_type_id.amortization_method or 'french'
-            repayments, remaining = [], principal
-
-            if method == 'french':
-                if rate == 0:
-                    payment = principal / months
-                    for i in range(1, months + 1):
-                        interest = 0.0
-                        capital = payment
-                        remaining = max(0.0, remaining - capital)
-                        repayments.append((0, 0, {
-                            'sequence': i,
-                            'due_date': fields.Date.add(start_date, months=i),
-                            'principal': round(capital, 2),
-                            'interest': round(interest, 2),
-                            'remaining_balance': round(remaining, 2),
-                        }))
-                else:
-                    payment = (principal * rate) / (1 - (1 + rate) ** (-months))
-                    for i in range(1, months + 1):
-                        interest = remaining * rate
-                        capital = payment - interest
-                        remaining = max(0.0, remaining - capital)
-                        repayments.append((0, 0, {
-                            'sequence': i,
-                            'due_date': fields.Date.add(start_date, months=i),
-                            'principal': round(capital, 2),
-                            'interest': round(interest, 2),
-                            'remaining_balance': round(remaining, 2),
-                        }))
-
-            elif method == 'german':
-                capital = principal / months
-                for i in range(1, months + 1):
-                    interest = remaining * rate
-                    remaining = max(0.0, remaining - capital)
-                    repayments.append((0, 0, {
-                        'sequence': i,
-                        'due_date': fields.Date.add(start_date, months=i),
-                        'principal': round(capital, 2),
-                        'interest': round(interest, 2),
-                        'remaining_balance': round(remaining, 2),
-                    }))
-            loan.write({'loan_repayment_ids': repayments})
-        self.write({'repayments_dirty': False})
+        self._generate_repayments()
+
+    @instrumented
+    def action_bulk_calculate_repayments(self):
+        start = time.perf_counter()
+        loans = self.filtered(lambda loan: loan.loan_status in ('confirmed', 'pending'))
+        with loans._bulk_tracking('Recálculo masivo de cuotas') as bulk_loans:
+            bulk_loans._generate_repayments()
+        elapsed = time.perf_counter() - start
+        message = f"Se recalcularon las cuotas de {len(loans)} préstamos en {elapsed:.2f} segundos."
+        if len(loans) < len(self):
+            message += f" Se omitieron {len(self) - len(loans)} préstamos que no están en estado Confirmado o Pendiente."
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Recalcular Cuotas',
+                'message': message,
+                'type': 'success',
+                'sticky': False,
+            },
+        }
 
+    @instrumented
     def action_confirmed(self):
-        for record in self:
-            record.loan_status = 'confirmed'
-            documentation_model = self.env['loan.manager.documentation']
-            for requirement in record.documents_required:
-                existing = documentation_model.search([
-                    ('loan_id', '=', record.id),
-                    ('requirement_id', '=', requirement.id)
-                ])
-                if not existing:
-                    documentation_model.create({
-                        'loan_id': record.id,
-                        'requirement_id': requirement.id,
-                        'reference': 'New',
-                        'filename': '',
-                        'file': False,
-                    })
-
+        with self._bulk_tracking('Confirmación de préstamos') as loans:
+            loans.write({'loan_status': 'confirmed'})
+        documentation_model = self.env['loan.manager.documentation']
+        existing = {
+            (document.loan_id.id, document.requirement_id.id)
+            for document in documentation_model.search([('loan_id', 'in', self.ids)])
+        }
+        documentation_model.create([{
+            'loan_id': record.id,
+            'requirement_id': requirement.id,
+            'reference': 'New',
+            'filename': '',
+            'file': False,
+        } for record in self for requirement in record.documents_required if (record.id, requirement.id) not in existing])
+
+    @instrumented
     def action_pending(self):
         self._validate_repayments_before_status_change()
         for record in self:
             if record.repayments_dirty:
                 raise ValidationError("Debe recalcular las cuotas antes de cambiar el estado, ya que ha cambiado el monto, plazo o tasa de interes.")
-            mandatory_requirements = record.documents_required.filtered(lambda r: r.mandatory)
-            for req in mandatory_requirements:
-                doc_uploaded = record.uploaded_documents.filtered(lambda d: d.requirement_id == req and d.file)
-                if not doc_uploaded:
-                    raise ValidationError(
-                        f"Debe cargar el documento obligatorio: '{req.loan_requirement}' antes de solicitar el préstamo.")
-            record.loan_status = 'pending'
+            if record.documents_missing_count:
+                presented = record.uploaded_documents.with_context(bin_size=True).filtered(lambda d: d.file).requirement_id
+                req = (record.documents_required.filtered(lambda r: r.mandatory) - presented)[:1]
+                raise ValidationError(
+                    f"Debe cargar el documento obligatorio: '{req.loan_requirement}' antes de solicitar el préstamo.")
+        with self._bulk_tracking('Solicitud de préstamos') as loans:
+            loans.write({'loan_status': 'pending'})
 
+    @instrumented
     def action_approved(self):
         self._validate_repayments_before_status_change()
         for record in self:
             if record.repayments_dirty:
                 raise ValidationError("Debe recalcular las cuotas antes de cambiar el estado, ya que ha cambiado el monto, plaza o tasa de interes.")
-            record._compute_disburse_amount()
-            record.loan_status = 'approved'
+        with self._bulk_tracking('Aprobación de préstamos') as loans:
+            loans._compute_disburse_amount()
+            loans.write({'loan_status': 'approved'})
 
+    @instrumented
     def action_declined(self):
-        for record in self:
-            record.loan_status = 'declined'
+        with self._bulk_tracking('Rechazo de préstamos') as loans:
+            loans.write({'loan_status': 'declined'})
 
+    @instrumented
     def action_registered(self):
         self._validate_repayments_before_status_change()
-        self._register_loan()
-        for record in self:
-            record.loan_status = 'registered'
+        with self._bulk_tracking('Contabilización de préstamos') as loans:
+            loans._register_loan()
+            loans.write({'loan_status': 'registered'})
 
+    @instrumented
     def action_disbursed(self):
         self._validate_repayments_before_status_change()
-        self._disburse_loan()
-        for record in self:
-            record.loan_status = 'disbursed'
+        with self._bulk_tracking('Desembolso de préstamos') as loans:
+            loans._disburse_loan()
+            loans.write({'loan_status': 'disbursed'})
 
 
 class LoanDocumentation(models.Model):
@@ -510,7 +801,7 @@ class LoanDocumentation(models.Model):
     loan_id = fields.Many2one('loan.manager.loan', string='Prestamo', required=True, readonly=True, copy=False)
     requirement_id = fields.Many2one('loan.manager.requirement', string='Requisito', required=True, readonly=True, copy=False)
     mandatory = fields.Boolean(related='requirement_id.mandatory', string='Obligatorio', store=False)
-    file = fields.Binary(string='Archivo', required=True)
+    file = fields.Binary(string='Archivo', required=True, attachment=True)
     filename = fields.Char(string='Nombre de Archivo', required=True, readonly=True, copy=False)
     status = fields.Selection([
         ('pending', 'Pendiente'),
@@ -519,15 +810,15 @@ class LoanDocumentation(models.Model):
 
     @api.model_create_multi
     def create(self, vals_list):
+        loans = self.env['loan.manager.loan'].browse({vals['loan_id'] for vals in vals_list})
+        loans_by_id = {loan.id: loan for loan in loans}
         for vals in vals_list:
-            if vals.get('reference', _('New')) == _('New'):
-                vals['reference'] = self.env['ir.sequence'].next_by_code('loan.manager.documentation') or _('New')
-            loan = self.env['loan.manager.loan'].browse(vals['loan_id'])
+            self._validate_file_size(vals)
+            loan = loans_by_id[vals['loan_id']]
             if loan.loan_status != 'confirmed':
                 raise ValidationError("Solo puede subir documentos cuando el préstamo está en estado 'Confirmado'.")
-            if vals.get('reference', 'New') == 'New':
-                vals['reference'] = self.env['ir.sequence'].next_by_code(
-                    'loan.documentation') or 'New'
+            if vals.get('reference', _('New')) == _('New'):
+                vals['reference'] = self._get_document_reference(loan.reference, vals.get('requirement_id'))
             if vals.get('file') and not vals.get('filename'):
                 loan = self.env['loan.manager.loan'].browse(vals['loan_id'])
                 requirement = self.env['loan.manager.requirement'].browse(vals['requirement_id'])
@@ -538,6 +829,7 @@ class LoanDocumentation(models.Model):
         for record in self:
             if record.loan_id.loan_status != 'confirmed':
                 raise ValidationError("No se pueden modificar documentos si el préstamo no está en estado 'Confirmado'.")
+        self._validate_file_size(vals)
         if 'file' in vals and not vals.get('filename'):
             loan = self.loan_id
             requirement = self.requirement_id
@@ -545,6 +837,45 @@ class LoanDocumentation(models.Model):
             self.status = 'presented'
         return super().write(vals)
 
+    @api.model
+    def _get_document_reference(self, loan_reference, requirement_id):
+        # Like installment references, document references derive from the loan reference and the requirement, so
+        # a checklist batch does not draw one sequence number per document.
+        if not loan_reference or loan_reference == _('New') or not requirement_id:
+            return self.env['ir.sequence'].next_by_code('loan.manager.documentation') or _('New')
+        return f"{loan_reference}/DOC-{requirement_id:03d}"
+
+    # Validations
+    def _validate_file_size(self, vals):
+        if not vals.get('file'):
+            return
+        max_size_mb = float(self.env['ir.config_parameter'].sudo().get_param('tel_capp_lm.documentation_max_size_mb') or 0)
+        if max_size_mb and len(vals['file']) * 3 / 4 > max_size_mb * 1024 * 1024:
+            raise ValidationError(f"El archivo supera el tamaño máximo permitido de {max_size_mb:g} MB.")
+
+    @api.model
+    def _migrate_files_to_attachments(self):
+        # Documents uploaded before files were stored as attachments still have their content in the "file"
+        # column. It is moved to the filestore in batches, where identical files share the same checksum path.
+        cr = self.env.cr
+        if not sql.column_exists(cr, self._table, 'file'):
+            return
+        cr.execute(f"SELECT id FROM {self._table} WHERE file IS NOT NULL ORDER BY id")
+        document_ids = [row[0] for row in cr.fetchall()]
+        Attachment = self.env['ir.attachment'].sudo()
+        for start in range(0, len(document_ids), 100):
+            cr.execute(f"SELECT id, file FROM {self._table} WHERE id = ANY(%s)", [document_ids[start:start + 100]])
+            Attachment.create([{
+                'name': 'file',
+                'res_model': self._name,
+                'res_field': 'file',
+                'res_id': document_id,
+                'type': 'binary',
+                'datas': bytes(content),
+            } for document_id, content in cr.fetchall()])
+            Attachment.invalidate_model()
+        cr.execute(f'ALTER TABLE {self._table} DROP COLUMN "file"')
+
     @api.onchange('file')
     def _onchange_file(self):
         if self.file and self.loan_id.partner_id and self.requirement_id:
@@ -562,9 +893,10 @@ class LoanRepayment(models.Model):
     _rec_name = 'reference'
 
     reference = fields.Char(string='Referencia', readonly=True, copy=False, default=lambda self: _('New'), tracking=True)
-    loan_id = fields.Many2one('loan.manager.loan', string='Prestamo', required=True, ondelete='cascade')
+    loan_id = fields.Many2one('loan.manager.loan', string='Prestamo', required=True, ondelete='cascade', index=True)
+    partner_id = fields.Many2one(related='loan_id.partner_id', string='Cliente', store=True, index=True)
     sequence = fields.Integer(string='Número de Cuota', required=True)
-    due_date = fields.Date(string='Fecha de Pago', required=True)
+    due_date = fields.Date(string='Fecha de Pago', required=True, index=True)
     payment_date = fields.Date(string='Fecha de Contabilización')
     principal = fields.Float(string='Capital', required=True)
     interest = fields.Float(string='Interés', required=True)
@@ -577,21 +909,48 @@ class LoanRepayment(models.Model):
         ('paid', 'Pagado'),
         ('partial', 'Parcial'),
         ('extra', 'Extra'),
-    ], default='pending', readonly=True, copy=False)
+    ], default='pending', readonly=True, copy=False, index=True)
     move_id = fields.Many2one('account.move', string='Asiento', readonly=True, copy=False, ondelete='set null', help='Asiento contable creado al registrar el pago de esta cuota.')
+    is_overdue = fields.Boolean(string='Vencida', readonly=True, copy=False, index=True)
+    days_past_due = fields.Integer(string='Días de Atraso', readonly=True, copy=False)
+    late_fee = fields.Float(string='Cargo por Mora', readonly=True, copy=False)
+    late_fee_move_id = fields.Many2one('account.move', string='Asiento de Mora', readonly=True, copy=False, ondelete='set null')
+    is_split = fields.Boolean(string='Saldo de Pago Parcial', readonly=True, copy=False, help='Cuota creada con el saldo de una cuota pagada parcialmente.')
+
+    _sql_constraints = [
+        ('unique_repayment_loan_sequence', 'UNIQUE(loan_id, sequence)', 'El número de cuota debe ser único por préstamo.'),
+    ]
 
     @api.model_create_multi
     def create(self, vals_list):
+        loans = self.env['loan.manager.loan'].browse({vals['loan_id'] for vals in vals_list if vals.get('loan_id')})
+        references = {loan.id: loan.reference for loan in loans}
         for vals in vals_list:
             if vals.get('reference', _('New')) == _('New'):
-                vals['reference'] = self.env['ir.sequence'].next_by_code('loan.manager.repayment') or _('New')
+                vals['reference'] = self._get_installment_reference(references.get(vals.get('loan_id')), vals.get('sequence'))
         return super().create(vals_list)
 
+    def init(self):
+        sql.create_index(self.env.cr, 'loan_manager_repayment_status_due_date_index', self._table, ['status', 'due_date'])
+
+    @api.model
+    def _get_installment_reference(self, loan_reference, sequence):
+        # Installment references derive from the loan reference and the installment number, so they stay the same
+        # when a schedule is regenerated and no sequence has to be drawn per installment.
+        if not loan_reference or loan_reference == _('New') or not sequence:
+            return self.env['ir.sequence'].next_by_code('loan.manager.repayment') or _('New')
+        return f"{loan_reference}/{sequence:03d}"
+
     def write(self, vals):
-        allowed = {'status', 'move_id', 'payment_date', 'amount_paid'}
+        allowed = {'status', 'move_id', 'payment_date', 'amount_paid', 'late_fee', 'late_fee_move_id'}
         illegal = set(vals.keys()) - allowed
-        if illegal:
+        if illegal and not self.env.context.get('loan_reamortization'):
             raise ValidationError("Las cuotas no se pueden editar manualmente.")
+        if vals.get('status') in ('paid', 'partial'):
+            vals = dict(vals, is_overdue=False)
+            res = super().write(vals)
+            self.loan_id._materialize_installments()
+            return res
         return super().write(vals)
 
     @api.depends('principal', 'interest')
@@ -599,11 +958,8 @@ class LoanRepayment(models.Model):
         for rec in self:
             rec.total_payment = rec.principal + rec.interest
 
-    def _create_payment_move(self, capital=None, interest=None, payment_date=None):
+    def _prepare_payment_move_lines(self, capital=None, interest=None, late_fee=None):
         self.ensure_one()
-        AccountMove = self.env['account.move']
-        Journal = self.env['account.journal']
-
         rec = self
         loan = rec.loan_id
         company = loan.company_id
@@ -619,25 +975,17 @@ class LoanRepayment(models.Model):
 
         capital = capital or 0.0
         interest = interest or 0.0
-        total_payment = capital + interest
+        late_fee = late_fee or 0.0
+        total_payment = capital + interest + late_fee
 
         if total_payment <= 0:
             raise ValidationError("El monto del pago debe ser mayor que 0.")
 
-        journal = Journal.search([
-            ('type', 'in', ('bank', 'cash')),
-            ('company_id', '=', company.id),
-        ], limit=1) or Journal.search([
-            ('type', '=', 'general'),
-            ('company_id', '=', company.id),
-        ], limit=1)
-        if not journal:
-            raise ValidationError(f"No se encontró un diario para la empresa {company.name}.")
-
         def _line(vals):
             v = dict(vals)
             v.setdefault('currency_id', company_currency.id)
             v.setdefault('amount_currency', (v.get('debit', 0.0) or 0.0) - (v.get('credit', 0.0) or 0.0))
+            v.setdefault('loan_repayment_id', rec.id)
             return v
 
         lines = []
@@ -666,32 +1014,331 @@ class LoanRepayment(models.Model):
                 'credit': interest,
             })))
 
-        move = AccountMove.create({
-            'ref': f'Pago cuota {rec.sequence} {loan.reference}',
-            'date': payment_date,
-            'journal_id': journal.id,
-            'company_id': company.id,
-            'currency_id': company_currency.id,
-            'line_ids': lines,
-        })
+        # The late fee was charged to the partner's loan receivable, so collecting it clears that same account.
+        if late_fee > 0:
+            lines.append((0, 0, _line({
+                'name': f'Cargo por mora cuota {rec.sequence} {loan.reference}',
+                'account_id': loan.loan_account_number.id,
+                'partner_id': partner.id,
+                'debit': 0.0,
+                'credit': late_fee,
+            })))
+        return lines
 
-        move.action_post()
+    def _get_collection_move(self, journal, date):
+        AccountMove = self.env['account.move']
+        move = AccountMove.search([
+            ('loan_collection_batch', '=', True),
+            ('state', '=', 'draft'),
+            ('journal_id', '=', journal.id),
+            ('date', '=', date),
+        ], limit=1)
+        if not move:
+            move = AccountMove.create({
+                'ref': f'Cobros de préstamos {date}',
+                'date': date,
+                'journal_id': journal.id,
+                'company_id': journal.company_id.id,
+                'currency_id': journal.company_id.currency_id.id,
+                'loan_collection_batch': True,
+            })
         return move
 
-    def action_mark_as_paid(self, payment_date=None):
-        for record in self:
-            previous_unpaid = self.env['loan.manager.repayment'].search([
-                ('loan_id', '=', record.loan_id.id),
-                ('sequence', '<', record.sequence),
-                ('status', 'not in', ['paid', 'partial']),
+    @instrumented
+    def _create_payment_moves(self, amounts, payment_date=None):
+        AccountMove = self.env['account.move']
+        moves = {}
+        collections = {}
+        move_vals = []
+        for rec in self:
+            loan = rec.loan_id
+            company = loan.company_id
+            capital, interest, late_fee = amounts[rec.id]
+            lines = rec._prepare_payment_move_lines(capital=capital, interest=interest, late_fee=late_fee)
+            journal = loan.loan_type_id._get_loan_journal('payment', company)
+            if not journal:
+                raise ValidationError(f"No se encontró un diario para la empresa {company.name}.")
+            if loan.loan_type_id.payment_move_mode == 'daily':
+                date = payment_date or fields.Date.context_today(rec)
+                collections.setdefault((journal, date), []).append((rec, lines))
+                continue
+            move_vals.append((rec, {
+                'ref': f'Pago cuota {rec.sequence} {loan.reference}',
+                'date': payment_date,
+                'journal_id': journal.id,
+                'company_id': company.id,
+                'currency_id': company.currency_id.id,
+                'line_ids': lines,
+            }))
+
+        if move_vals:
+            created = AccountMove.create([vals for _rec, vals in move_vals])
+            created.action_post()
+            for (rec, _vals), move in zip(move_vals, created):
+                moves[rec.id] = move
+
+        for (journal, date), items in collections.items():
+            move = self._get_collection_move(journal, date)
+            move.write({'line_ids': [line for _rec, lines in items for line in lines]})
+            for rec, _lines in items:
+                moves[rec.id] = move
+        return moves
+
+    def _create_payment_move(self, capital=None, interest=None, late_fee=None, payment_date=None):
+        self.ensure_one()
+        return self._create_payment_moves({self.id: (capital, interest, late_fee)}, payment_date=payment_date)[self.id]
+
+    def _get_amount_due(self):
+        # Late fees of unpaid installments are collected together with the installment.
+        self.ensure_one()
+        return round(self.total_payment + (self.late_fee if self.status in ('pending', 'extra') else 0.0), 2)
+
+    @api.model
+    def _cron_post_collection_moves(self):
+        moves = self.env['account.move'].search([
+            ('loan_collection_batch', '=', True),
+            ('state', '=', 'draft'),
+            ('date', '<', fields.Date.context_today(self)),
+        ])
+        if moves:
+            moves.action_post()
+
+    @api.model
+    def _cron_process_delinquency(self):
+        # Only installments that became overdue since the last run are flagged; the days past due of every open
+        # overdue installment are refreshed in the same set based pass. Both statements use the (status, due_date)
+        # index.
+        today = fields.Date.context_today(self)
+        self.flush_model()
+        self.env.cr.execute("""
+            UPDATE loan_manager_repayment
+               SET is_overdue = TRUE
+             WHERE status IN ('pending', 'extra')
+               AND due_date < %s
+               AND loan_status = 'disbursed'
+               AND is_overdue IS NOT TRUE
+         RETURNING id
+        """, [today])
+        newly_overdue = self.browse([row[0] for row in self.env.cr.fetchall()])
+        self.env.cr.execute("""
+            UPDATE loan_manager_repayment
+               SET days_past_due = %(today)s - due_date
+             WHERE status IN ('pending', 'extra')
+               AND due_date < %(today)s
+               AND is_overdue
+               AND days_past_due IS DISTINCT FROM %(today)s - due_date
+        """, {'today': today})
+        self.invalidate_model(['is_overdue', 'days_past_due'])
+        newly_overdue._apply_late_fees(today)
+        newly_overdue._send_overdue_digests()
+
+    def _apply_late_fees(self, date):
+        Move = self.env['account.move']
+        lines_by_journal = {}
+        charged = {}
+        for rec in self:
+            loan = rec.loan_id
+            loan_type = loan.loan_type_id
+            fee = loan_type.late_fee_amount
+            if fee <= 0 or rec.late_fee or not loan_type.late_fee_account or not loan.loan_account_number:
+                continue
+            journal = loan_type._get_loan_journal('register', loan.company_id)
+            if not journal:
+                continue
+            lines_by_journal.setdefault(journal, []).extend([
+                (0, 0, {
+                    'name': f'Cargo por mora cuota {rec.sequence} {loan.reference}',
+                    'account_id': loan.loan_account_number.id,
+                    'partner_id': loan.partner_id.id,
+                    'loan_repayment_id': rec.id,
+                    'debit': fee,
+                    'credit': 0.0,
+                }),
+                (0, 0, {
+                    'name': f'Cargo por mora cuota {rec.sequence} {loan.reference}',
+                    'account_id': loan_type.late_fee_account.id,
+                    'loan_repayment_id': rec.id,
+                    'debit': 0.0,
+                    'credit': fee,
+                }),
             ])
-            if previous_unpaid:
+            charged.setdefault((journal, fee), []).append(rec.id)
+
+        moves = {}
+        for journal, lines in lines_by_journal.items():
+            move = Move.create({
+                'ref': f'Cargos por mora {date}',
+                'date': date,
+                'journal_id': journal.id,
+                'company_id': journal.company_id.id,
+                'currency_id': journal.company_id.currency_id.id,
+                'line_ids': lines,
+            })
+            move.action_post()
+            moves[journal] = move
+        for (journal, fee), repayment_ids in charged.items():
+            self.browse(repayment_ids).write({'late_fee': fee, 'late_fee_move_id': moves[journal].id})
+
+    def _send_overdue_digests(self):
+        repayments_by_partner = {}
+        for rec in self:
+            if rec.partner_id.email:
+                repayments_by_partner.setdefault(rec.partner_id, []).append(rec)
+        self.env['mail.mail'].sudo().create([{
+            'subject': 'Aviso de cuotas vencidas',
+            'body_html': self._get_overdue_digest_body(partner, repayments),
+            'recipient_ids': [(4, partner.id)],
+            'email_from': repayments[0].loan_id.company_id.email_formatted or False,
+            'auto_delete': True,
+        } for partner, repayments in repayments_by_partner.items()])
+
+    @api.model
+    def _get_overdue_digest_body(self, partner, repayments):
+        rows = ''.join(
+            f"<tr><td>{rec.loan_id.reference}</td><td>{rec.sequence}</td><td>{rec.due_date}</td>"
+            f"<td style='text-align: right'>{rec.total_payment + rec.late_fee:,.2f}</td></tr>"
+            for rec in repayments
+        )
+        return (
+            f"<p>Estimado(a) {html_escape(partner.name)},</p>"
+            f"<p>Las siguientes cuotas de sus préstamos se encuentran vencidas:</p>"
+            f"<table border='1' cellpadding='4' style='border-collapse: collapse'>"
+            f"<tr><th>Préstamo</th><th>Cuota</th><th>Vencimiento</th><th>Monto</th></tr>{rows}</table>"
+            f"<p>Le agradecemos ponerse al día con sus pagos.</p>"
+        )
+
+    @instrumented
+    def _register_payment(self, amount, payment_date=None):
+        self.ensure_one()
+        if self.loan_status != 'disbursed' or self.status not in ['pending', 'extra']:
+            raise ValidationError("Solo puede pagar cuotas pendientes de préstamos desembolsados.")
+        if amount <= 0:
+            raise ValidationError("El monto a pagar debe ser mayor que 0.")
+        amount_due = self._get_amount_due()
+        if amount > amount_due and self.loan_id.loan_type_id.reamortization_mode != 'extra':
+            return self._register_prepayment(amount, payment_date=payment_date)
+        if amount >= amount_due:
+            self.action_mark_as_paid(payment_date=payment_date)
+            return 'paid'
+        self.action_partial_payment(amount, payment_date=payment_date)
+        return 'partial'
+
+    def _register_prepayment(self, amount, payment_date=None):
+        self.ensure_one()
+        excess = round(amount - self._get_amount_due(), 2)
+        if excess > self.remaining_balance:
+            raise ValidationError(f"El abono excede el saldo pendiente del préstamo ({self.remaining_balance:.2f}).")
+        self._check_payment_order()
+        move = self._create_payment_move(
+            capital=self.principal + excess,
+            interest=self.interest,
+            late_fee=self.late_fee,
+            payment_date=payment_date
+        )
+        # The excess is principal paid with this installment, so the row keeps matching its move and the paid totals.
+        self.with_context(loan_reamortization=True).write({
+            'status': 'paid',
+            'move_id': move.id,
+            'payment_date': payment_date,
+            'amount_paid': amount,
+            'principal': self.principal + excess,
+        })
+        self._reamortize(self.remaining_balance - excess)
+        return 'paid'
+
+    def _reamortize(self, balance, carried_interest=0.0):
+        # Only the unpaid installments after this one are recomputed from the real balance. Rows are rewritten in
+        # place and surplus rows are removed. For compact schedules the installments that are not materialized are
+        # recomputed inside the projection, otherwise missing ones are appended as rows after the last due date.
+        self.ensure_one()
+        loan = self.loan_id
+        loan_type = loan.loan_type_id
+        Repayment = self.with_context(loan_reamortization=True)
+        future = Repayment.search([
+            ('loan_id', '=', loan.id),
+            ('sequence', '>', self.sequence),
+            ('status', 'in', ['pending', 'extra']),
+        ], order='sequence')
+        projected = loan._get_projected_rows()
+        if not future and not projected:
+            return False
+
+        balance = round(max(balance, 0.0), 2)
+        method = loan_type.amortization_method or 'french'
+        try:
+            if not balance:
+                columns = ([], [], [])
+            elif loan_type.reamortization_mode == 'keep_term':
+                columns = amortization.amortize(balance, len(future) + len(projected), loan.interest_rate, method)
+            else:
+                first = future[:1] or projected[0]
+                installment = first['principal'] if method == 'german' else first['principal'] + first['interest']
+                columns = amortization.amortize_fixed_installment(balance, installment, loan.interest_rate, method)
+        except ValueError:
+            raise ValidationError("La cuota actual no cubre los intereses del saldo pendiente. Use el modo Mantener Plazo y Ajustar Cuota.")
+
+        rows = [dict(zip(('principal', 'interest', 'remaining_balance'), values)) for values in zip(*columns)]
+        if rows and carried_interest:
+            rows[0]['interest'] = round(rows[0]['interest'] + carried_interest, 2)
+
+        Repayment.browse(self.id).write({'remaining_balance': balance})
+        for repayment, values in zip(future, rows):
+            repayment.write(values)
+        future[len(rows):].unlink()
+
+        tail = rows[len(future):]
+        last = future[-1:] or self
+        dates = [row['due_date'] for row in projected][:len(tail)]
+        if len(tail) > len(dates):
+            plan = loan.tenure_plan or loan_type.tenure_plan or 'monthly'
+            dates += amortization.due_dates(dates[-1] if dates else last.due_date, len(tail) - len(dates), plan)
+        tail = [
+            dict(values, sequence=last.sequence + position, due_date=due_date)
+            for position, (due_date, values) in enumerate(zip(dates, tail), start=1)
+        ]
+        if projected or loan_type.schedule_storage == 'compact':
+            loan._set_projected_rows(tail)
+            loan._materialize_installments()
+        else:
+            Repayment.create([dict(values, loan_id=loan.id) for values in tail])
+        return True
+
+    def _check_payment_order(self):
+        for loan in self.loan_id:
+            repayments = self.filtered(lambda r: r.loan_id == loan).sorted('sequence')
+            pending = loan.next_repayment_id
+            if pending and pending.sequence < repayments[0].sequence:
                 raise ValidationError(
-                    f"No puede marcar como pagada la cuota #{record.sequence} porque la cuota #{previous_unpaid[0].sequence} aún está pendiente."
+                    f"No puede marcar como pagada la cuota #{repayments[0].sequence} porque la cuota #{pending.sequence} aún está pendiente."
                 )
-            move = record._create_payment_move(capital=record.principal, interest=record.interest, payment_date=payment_date)
-            record.write({'status': 'paid', 'move_id': move.id, 'payment_date': payment_date})
+            if len(repayments) > 1:
+                skipped = self.env['loan.manager.repayment'].search([
+                    ('loan_id', '=', loan.id),
+                    ('sequence', '<', repayments[-1].sequence),
+                    ('status', 'not in', ['paid', 'partial']),
+                    ('id', 'not in', repayments.ids),
+                ], order='sequence', limit=1)
+                if skipped:
+                    blocked = repayments.filtered(lambda r: r.sequence > skipped.sequence)[0]
+                    raise ValidationError(
+                        f"No puede marcar como pagada la cuota #{blocked.sequence} porque la cuota #{skipped.sequence} aún está pendiente."
+                    )
+
+    @instrumented
+    def action_mark_as_paid(self, payment_date=None):
+        self._check_payment_order()
+        repayments = self.sorted(lambda r: (r.loan_id.id, r.sequence))
+        moves = repayments._create_payment_moves(
+            {record.id: (record.principal, record.interest, record.late_fee) for record in repayments},
+            payment_date=payment_date,
+        )
+        repayment_ids_by_move = {}
+        for record in repayments:
+            repayment_ids_by_move.setdefault(moves[record.id], []).append(record.id)
+        for move, repayment_ids in repayment_ids_by_move.items():
+            self.browse(repayment_ids).write({'status': 'paid', 'move_id': move.id, 'payment_date': payment_date})
 
+    @instrumented
     def action_partial_payment(self, amount, payment_date=None):
         self.ensure_one()
         loan = self.loan_id
@@ -702,8 +1349,12 @@ class LoanRepayment(models.Model):
         if self.status == 'paid':
             raise ValidationError("Esta cuota ya está pagada completamente.")
 
-        paid_interest = min(self.interest, amount)
-        remaining_after_interest = amount - paid_interest
+        late_fee = self.late_fee if self.status in ('pending', 'extra') else 0.0
+        if amount < late_fee:
+            raise ValidationError(f"El pago parcial debe cubrir al menos el cargo por mora de la cuota ({late_fee:.2f}).")
+
+        paid_interest = min(self.interest, amount - late_fee)
+        remaining_after_interest = amount - late_fee - paid_interest
         paid_principal = min(self.principal, remaining_after_interest)
 
         remaining_interest = self.interest - paid_interest
@@ -712,6 +1363,7 @@ class LoanRepayment(models.Model):
         move = self._create_payment_move(
             capital=paid_principal,
             interest=paid_interest,
+            late_fee=late_fee,
             payment_date=payment_date
         )
 
@@ -722,28 +1374,29 @@ class LoanRepayment(models.Model):
             'amount_paid': amount,
         })
 
-        last_due_date = max(loan.loan_repayment_ids.mapped('due_date') or [self.due_date])
+        if loan.loan_type_id.reamortization_mode != 'extra':
+            balance = self.remaining_balance + remaining_principal
+            if self._reamortize(balance, carried_interest=remaining_interest):
+                return True
 
+        [(last_due_date, last_sequence)] = self._read_group(
+            [('loan_id', '=', loan.id)], [], ['due_date:max', 'sequence:max'],
+        )
+        projected = loan._get_projected_rows()
+        if projected and projected[-1]['sequence'] > (last_sequence or 0):
+            last_due_date, last_sequence = projected[-1]['due_date'], projected[-1]['sequence']
         plan = loan.loan_type_id.tenure_plan or 'monthly'
-        if plan == 'monthly':
-            new_due_date = fields.Date.add(last_due_date, months=1)
-        elif plan == 'biweekly':
-            new_due_date = fields.Date.add(last_due_date, days=14)
-        elif plan == 'weekly':
-            new_due_date = fields.Date.add(last_due_date, days=7)
-        else:
-            new_due_date = fields.Date.add(last_due_date, months=1)
-
-        new_sequence = max(loan.loan_repayment_ids.mapped('sequence') or [0]) + 1
+        new_due_date = amortization.due_dates(last_due_date or self.due_date, 1, plan)[0]
 
         self.env['loan.manager.repayment'].create({
             'loan_id': loan.id,
-            'sequence': new_sequence,
+            'sequence': (last_sequence or 0) + 1,
             'due_date': new_due_date,
             'principal': round(remaining_principal, 2),
             'interest': round(remaining_interest, 2),
             'remaining_balance': 0,
             'status': 'extra',
+            'is_split': True,
         })
 
         return True
@@ -771,27 +1424,77 @@ class LoanRepaymentConfirmWizard(models.TransientModel):
                 'repayment_id': repayment.id,
                 'principal': repayment.principal,
                 'interest': repayment.interest,
-                'total_to_pay': repayment.total_payment,
-                'partial_amount': repayment.total_payment,
+                'total_to_pay': repayment._get_amount_due(),
+                'partial_amount': repayment._get_amount_due(),
             })
         return res
 
     def action_confirm(self):
         self.ensure_one()
-        r = self.repayment_id.sudo()
+        self.repayment_id.sudo()._register_payment(self.partial_amount, payment_date=self.payment_date)
+        return {'type': 'ir.actions.act_window_close'}
 
-        if r.loan_status != 'disbursed' or r.status not in ['pending', 'extra']:
-            raise ValidationError("Solo puede pagar cuotas pendientes de préstamos desembolsados.")
-        amount = self.partial_amount
-        if amount <= 0:
-            raise ValidationError("El monto a pagar debe ser mayor que 0.")
-        if amount >= r.total_payment:
-            r.action_mark_as_paid(payment_date=self.payment_date)
-        else:
-            r.action_partial_payment(amount, payment_date=self.payment_date)
+
+class LoanSettlementWizard(models.TransientModel):
+    """
+        DOCSTRING: LoanSettlementWizard transient model responsible for quoting and settling the early payoff of one or many loans.
+    """
+    _name = 'loan.manager.settlement.wizard'
+    _description = 'Cancelación Anticipada de Préstamos'
+
+    loan_ids = fields.Many2many('loan.manager.loan', string='Préstamos', required=True, domain=[('loan_status', '=', 'disbursed')])
+    payment_date = fields.Date(string='Fecha de Cancelación', required=True, default=fields.Date.today)
+    line_ids = fields.One2many('loan.manager.settlement.line', 'wizard_id', string='Cotización', compute='_compute_line_ids', store=True, readonly=True)
+    amount_total = fields.Float(string='Total a Cobrar', compute='_compute_amount_total')
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        if self.env.context.get('active_model') == 'loan.manager.loan':
+            loans = self.env['loan.manager.loan'].browse(self.env.context.get('active_ids') or [])
+            res['loan_ids'] = [(6, 0, loans.filtered(lambda loan: loan.loan_status == 'disbursed').ids)]
+        return res
+
+    @api.depends('loan_ids', 'payment_date')
+    def _compute_line_ids(self):
+        for wizard in self:
+            quotes = wizard.loan_ids._origin._get_payoff_quotes(wizard.payment_date)
+            wizard.line_ids = [(5, 0, 0)] + [
+                (0, 0, dict(quote, loan_id=loan_id)) for loan_id, quote in quotes.items()
+            ]
+
+    @api.depends('line_ids.total')
+    def _compute_amount_total(self):
+        for wizard in self:
+            wizard.amount_total = sum(wizard.line_ids.mapped('total'))
+
+    def action_confirm(self):
+        self.ensure_one()
+        loans = self.line_ids.filtered(lambda line: line.installments).loan_id
+        if not loans:
+            raise ValidationError("Ninguno de los préstamos seleccionados tiene cuotas pendientes para cancelar.")
+        loans._settle_loans(self.payment_date)
         return {'type': 'ir.actions.act_window_close'}
 
 
+class LoanSettlementLine(models.TransientModel):
+    """
+        DOCSTRING: LoanSettlementLine transient model responsible for holding the payoff quote of each loan in the settlement wizard.
+    """
+    _name = 'loan.manager.settlement.line'
+    _description = 'Cotización de Cancelación Anticipada'
+
+    wizard_id = fields.Many2one('loan.manager.settlement.wizard', required=True, ondelete='cascade')
+    loan_id = fields.Many2one('loan.manager.loan', string='Préstamo', readonly=True)
+    partner_id = fields.Many2one(related='loan_id.partner_id', string='Cliente')
+    installments = fields.Integer(string='Cuotas Pendientes', readonly=True)
+    principal = fields.Float(string='Capital', readonly=True)
+    interest = fields.Float(string='Interés Vencido', readonly=True)
+    commission = fields.Float(string='Comisión por Pago Anticipado', readonly=True)
+    late_fee = fields.Float(string='Cargos por Mora', readonly=True)
+    total = fields.Float(string='Total', readonly=True)
+
+
 class LoanRejectWizard(models.TransientModel):
     """
         DOCSTRING:LoanRejectWizard transient model responsible for capturing information about rejections and setting it to the loan modal.
@@ -0,0 +1,156 @@
+import logging
+import threading
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Define your models here.
+
+
+class LoanInterestAccrual(models.Model):
+    """
+        DOCSTRING: LoanInterestAccrual model responsible for the month-end accrual of earned but unpaid interest, keeping a checkpoint so interrupted runs resume where they stopped.
+    """
+    _name = 'loan.manager.interest.accrual'
+    _description = 'Loan Interest Accrual'
+    _rec_name = 'date'
+    _order = 'date desc'
+
+    date = fields.Date(string='Fecha de Devengo', required=True, readonly=True)
+    reversal_date = fields.Date(string='Fecha de Reversión', required=True, readonly=True)
+    state = fields.Selection([
+        ('running', 'En Proceso'),
+        ('done', 'Completado'),
+    ], string='Estado', required=True, default='running', readonly=True)
+    last_loan_id = fields.Integer(string='Último Préstamo Procesado', readonly=True, help='Punto de control: los préstamos con un ID menor o igual ya fueron devengados.')
+    loan_count = fields.Integer(string='Préstamos Devengados', readonly=True)
+    amount_total = fields.Float(string='Interés Devengado', readonly=True)
+    move_ids = fields.Many2many('account.move', string='Asientos', readonly=True, copy=False)
+
+    _sql_constraints = [
+        ('unique_accrual_date', 'UNIQUE(date)', 'Solo puede existir un devengo por fecha.'),
+    ]
+
+    # Internal Methods
+    def _get_accrual_loans(self, limit):
+        self.ensure_one()
+        return self.env['loan.manager.loan'].search([
+            ('loan_status', '=', 'disbursed'),
+            ('loan_type_id.accrued_interest_account', '!=', False),
+            ('id', '>', self.last_loan_id),
+        ], order='id', limit=limit)
+
+    def _compute_accrued_interest(self, loans):
+        # Interest of installments already due is fully earned. The installment in progress at the accrual date
+        # is prorated by the days elapsed since the previous due date (the loan start for the first installment).
+        self.ensure_one()
+        self.env['loan.manager.repayment'].flush_model(['loan_id', 'sequence', 'status', 'due_date', 'interest'])
+        self.env['loan.manager.loan'].flush_model(['create_date_only'])
+        self.env.cr.execute("""
+            SELECT s.loan_id,
+                   SUM(CASE
+                           WHEN s.due_date <= %(date)s THEN s.interest
+                           WHEN s.period_start < %(date)s
+                               THEN s.interest * (%(date)s - s.period_start) / GREATEST(s.due_date - s.period_start, 1)
+                           ELSE 0.0
+                       END)
+              FROM (
+                    SELECT r.loan_id,
+                           r.status,
+                           r.due_date,
+                           r.interest,
+                           COALESCE(LAG(r.due_date) OVER (PARTITION BY r.loan_id ORDER BY r.sequence), l.create_date_only) AS period_start
+                      FROM loan_manager_repayment r
+                      JOIN loan_manager_loan l ON l.id = r.loan_id
+                     WHERE r.loan_id = ANY(%(loan_ids)s)
+                   ) s
+             WHERE s.status IN ('pending', 'extra')
+          GROUP BY s.loan_id
+        """, {'date': self.date, 'loan_ids': loans.ids})
+        return {loan_id: round(amount or 0.0, 2) for loan_id, amount in self.env.cr.fetchall()}
+
+    def _post_accrual_moves(self, loans, amounts):
+        self.ensure_one()
+        Move = self.env['account.move']
+        lines_by_journal = {}
+        for loan in loans:
+            amount = amounts.get(loan.id, 0.0)
+            if amount <= 0 or not loan.interest_account_number:
+                continue
+            journal = loan.loan_type_id._get_loan_journal('register', loan.company_id)
+            if not journal:
+                _logger.warning("No existe un diario general en la empresa %s, se omite el devengo de %s.", loan.company_id.name, loan.reference)
+                continue
+            lines_by_journal.setdefault(journal, []).extend([
+                (0, 0, {
+                    'name': f'Devengo de intereses {loan.reference}',
+                    'account_id': loan.loan_type_id.accrued_interest_account.id,
+                    'partner_id': loan.partner_id.id,
+                    'debit': amount,
+                    'credit': 0.0,
+                }),
+                (0, 0, {
+                    'name': f'Devengo de intereses {loan.reference}',
+                    'account_id': loan.interest_account_number.id,
+                    'debit': 0.0,
+                    'credit': amount,
+                }),
+            ])
+
+        moves = Move
+        for journal, lines in lines_by_journal.items():
+            move = Move.create({
+                'ref': f'Devengo de intereses {self.date}',
+                'date': self.date,
+                'journal_id': journal.id,
+                'company_id': journal.company_id.id,
+                'currency_id': journal.company_id.currency_id.id,
+                'line_ids': lines,
+            })
+            move.action_post()
+            reversal = move._reverse_moves([{
+                'date': self.reversal_date,
+                'ref': f'Reversión devengo de intereses {self.date}',
+            }])
+            reversal.action_post()
+            moves |= move | reversal
+        return moves
+
+    def _process(self, chunk_size=500):
+        # Every chunk is committed together with the checkpoint, so a run cut by the maintenance window or a
+        # worker restart continues from the last committed loan on the next call.
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        for accrual in self.filtered(lambda run: run.state == 'running'):
+            while True:
+                loans = accrual._get_accrual_loans(chunk_size)
+                if not loans:
+                    break
+                amounts = accrual._compute_accrued_interest(loans)
+                moves = accrual._post_accrual_moves(loans, amounts)
+                accrual.write({
+                    'last_loan_id': loans[-1].id,
+                    'loan_count': accrual.loan_count + len([loan for loan in loans if amounts.get(loan.id)]),
+                    'amount_total': accrual.amount_total + sum(amounts.values()),
+                    'move_ids': [(4, move.id) for move in moves],
+                })
+                if auto_commit:
+                    self.env.cr.commit()
+            accrual.state = 'done'
+            if auto_commit:
+                self.env.cr.commit()
+
+    @api.model
+    def _get_accrual_run(self, accrual_date):
+        return self.search([('date', '=', accrual_date)], limit=1) or self.create({
+            'date': accrual_date,
+            'reversal_date': fields.Date.add(accrual_date, days=1),
+        })
+
+    @api.model
+    def _cron_accrue_interest(self, chunk_size=500):
+        accrual_date = fields.Date.subtract(fields.Date.start_of(fields.Date.context_today(self), 'month'), days=1)
+        self._get_accrual_run(accrual_date)._process(chunk_size)
+
+    # Button Actions
+    def action_resume(self):
+        self._process()
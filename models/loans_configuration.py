@@ -1,8 +1,36 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 from odoo.exceptions import ValidationError
 
 # Define your models here.
 
+LOAN_JOURNAL_USAGES = {
+    'register': ('register_journal_id', (('general',),)),
+    'disburse': ('disburse_journal_id', (('bank', 'cash'), ('general',))),
+    'payment': ('payment_journal_id', (('bank', 'cash'), ('general',))),
+}
+
+ACCOUNT_TERMS_FIELDS = (
+    'loan_account',
+    'interest_account',
+    'life_insurance_account',
+    'disburse_account',
+    'disburse_bank_account',
+    'payment_account',
+    'legal_expenses_account',
+    'anticipated_payment_commission_account',
+    'disburse_commission_account',
+)
+
+LOAN_TERMS_FIELDS = (
+    'interest_rate',
+    'disburse_commission',
+    'anticipated_payment_commission',
+    'legal_expenses',
+    'life_insurance',
+    'amortization_method',
+    'tenure_plan',
+) + ACCOUNT_TERMS_FIELDS
+
 
 class LoanRequirement(models.Model):
     """
@@ -11,7 +39,7 @@ class LoanRequirement(models.Model):
     _name = 'loan.manager.requirement'
     _description = 'Loan Requirement'
     _rec_name = 'loan_requirement'
-    _inherit = ['mail.thread']
+    _inherit = ['mail.thread', 'loan.manager.bulk.tracking.mixin']
 
     loan_requirement = fields.Char(string='Nombre del Requisito', required=True, tracking=True)
     description = fields.Char(string='Descripción', required=False, tracking=True)
@@ -38,6 +66,8 @@ class LoanRequirement(models.Model):
         return super().create(vals_list)
 
     def write(self, vals):
+        if self._is_bulk_tracking_write():
+            return self._write_with_bulk_tracking(vals)
         if vals.get('loan_requirement'):
             vals['loan_requirement'] = vals['loan_requirement'].title()
         if vals.get('description'):
@@ -52,7 +82,7 @@ class LoanType(models.Model):
     _name = 'loan.manager.type'
     _description = 'Loan Type'
     _rec_name = 'loan_name'
-    _inherit = ['mail.thread']
+    _inherit = ['mail.thread', 'loan.manager.bulk.tracking.mixin']
 
     loan_name = fields.Char(string='Nombre de Prestamo', required=True, tracking=True)
     description = fields.Char(string='Descripción', required=False, tracking=True)
@@ -81,6 +111,7 @@ class LoanType(models.Model):
     life_insurance_account = fields.Many2one('account.account', string='Cuenta de Seguro de Vida', required=True, tracking=True, domain="['|', ('code', '=ilike', '2%'), ('code', '=ilike', '4%')]")
     interest_rate = fields.Float(string='Interes (%)', required=True, tracking=True)
     interest_account = fields.Many2one('account.account', string='Cuenta de Interés', required=True, tracking=True, domain="[('code', '=ilike', '4%')]")
+    accrued_interest_account = fields.Many2one('account.account', string='Cuenta de Intereses por Cobrar', tracking=True, domain="[('code', '=ilike', '1%')]", help='Cuenta de activo para el devengo mensual de intereses no cobrados. Si no se define, los préstamos de este tipo no se incluyen en el devengo.')
     documents = fields.Many2many(
         comodel_name='loan.manager.requirement',
         relation='loan_type_requirement_rel',
@@ -90,6 +121,24 @@ class LoanType(models.Model):
         tracking=True
     )
     criteria = fields.Text(string='Criterios', tracking=True)
+    register_journal_id = fields.Many2one('account.journal', string='Diario de Registro', tracking=True, domain="[('type', '=', 'general'), ('company_id', '=', company_id)]", help='Diario para el asiento de registro del préstamo. Si no se define se usa el primer diario general de la empresa.')
+    disburse_journal_id = fields.Many2one('account.journal', string='Diario de Desembolso', tracking=True, domain="[('type', 'in', ('bank', 'cash', 'general')), ('company_id', '=', company_id)]", help='Diario para el asiento de desembolso. Si no se define se usa el primer diario de banco o efectivo de la empresa.')
+    payment_move_mode = fields.Selection([
+        ('installment', 'Un Asiento por Cuota'),
+        ('daily', 'Asiento Diario Consolidado'),
+    ], string='Contabilización de Cobros', required=True, default='installment', tracking=True, help='Con el asiento diario consolidado, los pagos de cuotas del día se acumulan en un solo asiento por diario y fecha, publicado en lote al cierre del día.')
+    payment_journal_id = fields.Many2one('account.journal', string='Diario de Cobros', tracking=True, domain="[('type', 'in', ('bank', 'cash', 'general')), ('company_id', '=', company_id)]", help='Diario para los asientos de pago de cuotas. Si no se define se usa el primer diario de banco o efectivo de la empresa.')
+    reamortization_mode = fields.Selection([
+        ('extra', 'Cuota Extra al Final'),
+        ('keep_installment', 'Mantener Cuota y Reducir Plazo'),
+        ('keep_term', 'Mantener Plazo y Ajustar Cuota'),
+    ], string='Pagos Parciales y Abonos', required=True, default='extra', tracking=True, help='Define cómo se ajusta el plan de pagos cuando una cuota se paga de forma parcial o con un monto mayor. Con los modos de reamortización solo se recalculan las cuotas pendientes posteriores al pago.')
+    schedule_storage = fields.Selection([
+        ('rows', 'Todas las Cuotas'),
+        ('compact', 'Compacto (Cuotas al Vencer)'),
+    ], string='Almacenamiento del Plan de Pagos', required=True, default='rows', tracking=True, help='En modo compacto el plan proyectado se guarda en el préstamo y cada cuota se crea solo cuando está por vencer o se paga. La anticipación se define con el parámetro del sistema tel_capp_lm.materialize_lead_days (30 días por defecto).')
+    late_fee_amount = fields.Float(string='Cargo por Mora', default=0.0, tracking=True, help='Monto fijo que se carga una sola vez a cada cuota cuando pasa a estar vencida. Con 0 no se aplican cargos.')
+    late_fee_account = fields.Many2one('account.account', string='Cuenta de Cargos por Mora', tracking=True, domain="[('code', '=ilike', '4%')]")
     company_id = fields.Many2one(
         comodel_name='res.company',
         string='Empresa',
@@ -98,6 +147,8 @@ class LoanType(models.Model):
         required=True,
     )
     interest_rate_display = fields.Char(string='Tasa de Interes (%)', compute='_compute_interest_rate_display', store=False)
+    terms_id = fields.Many2one('loan.manager.terms', string='Términos Vigentes', readonly=True, copy=False)
+    terms_ids = fields.One2many('loan.manager.terms', 'loan_type_id', string='Versiones de Términos', readonly=True)
 
     _sql_constraints = [
         ('unique_loan_type_company', 'UNIQUE(loan_name, company_id)', 'El nombre del préstamo debe ser único por empresa.'),
@@ -113,9 +164,13 @@ class LoanType(models.Model):
                 vals['description'] = vals['description'].capitalize()
             if vals.get('criteria'):
                 vals['criteria'] = vals['criteria'].capitalize()
-        return super().create(vals_list)
+        loan_types = super().create(vals_list)
+        loan_types._sync_terms()
+        return loan_types
 
     def write(self, vals):
+        if self._is_bulk_tracking_write():
+            return self._write_with_bulk_tracking(vals)
         self._validate_percentage_rates(vals)
         if vals.get('loan_name'):
             vals['loan_name'] = vals['loan_name'].title()
@@ -123,7 +178,91 @@ class LoanType(models.Model):
             vals['description'] = vals['description'].capitalize()
         if vals.get('criteria'):
             vals['criteria'] = vals['criteria'].capitalize()
-        return super().write(vals)
+        res = super().write(vals)
+        if any(field_name in vals for field_name in LOAN_TERMS_FIELDS):
+            self._sync_terms()
+        if any(usage[0] in vals for usage in LOAN_JOURNAL_USAGES.values()) or 'company_id' in vals:
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        # Snapshots no loan points to only exist because of the type and go with it, the ones used by a loan keep
+        # restricting the deletion.
+        used_terms = self.env['loan.manager.loan'].sudo().with_context(active_test=False).search([
+            ('terms_id.loan_type_id', 'in', self.ids),
+        ]).terms_id
+        (self.sudo().terms_ids - used_terms).unlink()
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
+    # Terms
+    def _prepare_terms_values(self):
+        self.ensure_one()
+        loan_type = self.with_company(self.company_id)
+        values = {}
+        for field_name in LOAN_TERMS_FIELDS:
+            value = loan_type[field_name]
+            values[field_name] = value.id if isinstance(value, models.BaseModel) else value
+        return values
+
+    def _get_next_terms_version(self):
+        # Migrated snapshots may be newer than terms_id, so the next version follows the highest existing one.
+        self.ensure_one()
+        return max(self.sudo().terms_ids.mapped('version'), default=0) + 1
+
+    def _sync_terms(self):
+        Terms = self.env['loan.manager.terms'].sudo()
+        for loan_type in self:
+            values = loan_type._prepare_terms_values()
+            current = loan_type.terms_id
+            if current and current._get_terms_values() == values:
+                continue
+            loan_type.terms_id = Terms.create(dict(
+                values,
+                loan_type_id=loan_type.id,
+                company_id=loan_type.company_id.id,
+                version=loan_type._get_next_terms_version(),
+            ))
+
+    def _get_terms(self):
+        self.ensure_one()
+        if not self.terms_id:
+            self.sudo()._sync_terms()
+        return self.terms_id
+
+    def _get_loan_terms_vals(self):
+        self.ensure_one()
+        return {
+            'terms_id': self._get_terms().id,
+            'interest_rate': self.interest_rate,
+            'disburse_commission': self.disburse_commission,
+            'anticipated_payment_commission': self.anticipated_payment_commission,
+            'legal_expenses': self.legal_expenses,
+            'life_insurance': self.life_insurance,
+            'amortization_method': (self.amortization_method or '') if self.amortization_method else '',
+            'tenure_plan': (self.tenure_plan or '') if self.tenure_plan else '',
+        }
+
+    # Journals
+    @api.model
+    @tools.ormcache('loan_type_id', 'company_id', 'usage')
+    def _resolve_loan_journal_id(self, loan_type_id, company_id, usage):
+        journal_field, fallbacks = LOAN_JOURNAL_USAGES[usage]
+        if loan_type_id:
+            journal = self.sudo().browse(loan_type_id)[journal_field]
+            if journal and journal.company_id.id == company_id:
+                return journal.id
+        Journal = self.env['account.journal'].sudo()
+        for journal_types in fallbacks:
+            journal = Journal.search([('type', 'in', journal_types), ('company_id', '=', company_id)], limit=1)
+            if journal:
+                return journal.id
+        return False
+
+    def _get_loan_journal(self, usage, company):
+        journal_id = self._resolve_loan_journal_id(self[:1].id, company.id, usage)
+        return self.env['account.journal'].browse(journal_id)
 
     # Validations
     @api.constrains('max_amount', 'max_tenure')
@@ -165,4 +304,57 @@ class LoanType(models.Model):
         }
 
 
+class LoanTerms(models.Model):
+    """
+        DOCSTRING: LoanTerms model holds the immutable, versioned snapshots of the terms of a loan type that loans point to.
+    """
+    _name = 'loan.manager.terms'
+    _description = 'Loan Terms'
+    _order = 'loan_type_id, version desc'
+
+    loan_type_id = fields.Many2one('loan.manager.type', string='Tipo de Prestamo', required=True, readonly=True, index=True, ondelete='restrict')
+    version = fields.Integer(string='Versión', required=True, readonly=True)
+    company_id = fields.Many2one('res.company', string='Empresa', required=True, readonly=True)
+    interest_rate = fields.Float(string='Interes (%)', readonly=True)
+    disburse_commission = fields.Float(string='Comision por Desembolso (%)', readonly=True)
+    anticipated_payment_commission = fields.Float(string='Comision por Pago Anticipado (%)', readonly=True)
+    legal_expenses = fields.Float(string='Gastos Legales', readonly=True)
+    life_insurance = fields.Float(string='Seguro de Vida', readonly=True)
+    amortization_method = fields.Selection([
+        ('french', 'Cuota Nivelada'),
+        ('german', 'Cuota Sobre Saldos Insolutos')
+    ], string='Método de Amortización', readonly=True)
+    tenure_plan = fields.Selection([
+        ('monthly', 'Mensual'),
+        ('biweekly', 'Quincenal'),
+        ('weekly', 'Semanal'),
+    ], string='Plan de Pago', readonly=True)
+    loan_account = fields.Many2one('account.account', string='Cuenta por Cobrar Cliente', readonly=True)
+    interest_account = fields.Many2one('account.account', string='Cuenta de Interés', readonly=True)
+    life_insurance_account = fields.Many2one('account.account', string='Cuenta de Seguro de Vida', readonly=True)
+    disburse_account = fields.Many2one('account.account', string='Cuenta Provisión de Desembolso', readonly=True)
+    disburse_bank_account = fields.Many2one('account.account', string='Cuenta Bancaria de Desembolso', readonly=True)
+    payment_account = fields.Many2one('account.account', string='Cuenta de Cuotas', readonly=True)
+    legal_expenses_account = fields.Many2one('account.account', string='Cuenta de Gastos Legales', readonly=True)
+    anticipated_payment_commission_account = fields.Many2one('account.account', string='Cuenta de Comisión por Pago Anticipado', readonly=True)
+    disburse_commission_account = fields.Many2one('account.account', string='Cuenta de Comisión por Desembolso', readonly=True)
+
+    _sql_constraints = [
+        ('unique_loan_terms_version', 'UNIQUE(loan_type_id, version)', 'La versión de los términos debe ser única por tipo de préstamo.'),
+    ]
+
+    def write(self, vals):
+        raise ValidationError("Los términos de un tipo de préstamo no se pueden modificar, se crea una nueva versión al cambiar el tipo.")
+
+    @api.depends('loan_type_id', 'version')
+    def _compute_display_name(self):
+        for terms in self:
+            terms.display_name = f"{terms.loan_type_id.display_name} v{terms.version}"
 
+    def _get_terms_values(self):
+        self.ensure_one()
+        values = {}
+        for field_name in LOAN_TERMS_FIELDS:
+            value = self[field_name]
+            values[field_name] = value.id if isinstance(value, models.BaseModel) else value
+        return values
@@ -0,0 +1,487 @@
+import base64
+import csv
+import io
+import json
+import logging
+from odoo import models, fields, api
+from odoo.exceptions import UserError, ValidationError
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+    _logger.debug("openpyxl no está instalado, la importación de archivos XLSX no estará disponible.")
+
+# Define your models here.
+
+PAYMENT_IMPORT_COLUMNS = {
+    'reference': ('reference', 'referencia', 'prestamo', 'préstamo'),
+    'sequence': ('sequence', 'cuota', 'numero de cuota', 'número de cuota'),
+    'amount': ('amount', 'monto', 'monto pagado', 'deduccion', 'deducción'),
+}
+
+LOAN_IMPORT_COLUMNS = {
+    'partner': ('partner', 'cliente', 'asociado', 'vat', 'cedula', 'cédula', 'identificacion', 'identificación'),
+    'loan_type': ('loan_type', 'tipo', 'tipo de prestamo', 'tipo de préstamo'),
+    'amount': ('amount', 'monto', 'monto del prestamo', 'monto del préstamo'),
+    'tenure': ('tenure', 'plazo'),
+}
+
+
+def _normalize_header(value):
+    return str(value or '').strip().lower()
+
+
+def parse_amount(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value or '').strip().replace(' ', '')
+    if ',' in text and '.' not in text:
+        text = text.replace(',', '.')
+    return float(text.replace(',', '')) if text else 0.0
+
+
+def _map_columns(header, columns):
+    header = [_normalize_header(h) for h in header]
+    mapping = {}
+    for key, aliases in columns.items():
+        for alias in aliases:
+            if alias in header:
+                mapping[key] = header.index(alias)
+                break
+        else:
+            raise UserError(f"El archivo no contiene la columna requerida '{aliases[0]}'.")
+    return mapping
+
+
+def read_import_rows(content, filename, columns):
+    """
+        Yields (row_number, values) for every non empty data row of a CSV, XLSX or JSON file, values being a dict
+        keyed by the names of columns. The header row (the keys of the first object for JSON, which must hold a
+        list of objects) decides where each column is located.
+    """
+    first_row = 2
+    if (filename or '').lower().endswith('.json'):
+        try:
+            records = json.loads(content.decode('utf-8-sig'))
+        except ValueError:
+            raise UserError("El archivo JSON no es válido.")
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise UserError("El archivo JSON debe contener una lista de objetos.")
+        keys = list(records[0]) if records else []
+        rows = iter([keys] + [[record.get(key) for key in keys] for record in records])
+        first_row = 1
+    elif (filename or '').lower().endswith('.xlsx'):
+        if openpyxl is None:
+            raise UserError("La librería openpyxl es necesaria para importar archivos XLSX.")
+        workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+    else:
+        text = io.TextIOWrapper(io.BytesIO(content), encoding='utf-8-sig', newline='')
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        rows = csv.reader(text, dialect)
+    header = next(rows, None)
+    if not header:
+        raise UserError("El archivo está vacío.")
+    mapping = _map_columns(header, columns)
+    for row_number, row in enumerate(rows, start=first_row):
+        if not row or not any(cell not in (None, '') for cell in row):
+            continue
+        yield row_number, {key: (row[index] if index < len(row) else None) for key, index in mapping.items()}
+
+
+class LoanRepaymentImportWizard(models.TransientModel):
+    """
+        DOCSTRING: LoanRepaymentImportWizard transient model responsible for paying installments in bulk from payroll deduction files.
+    """
+    _name = 'loan.manager.repayment.import.wizard'
+    _description = 'Importar Pagos de Cuotas'
+
+    file = fields.Binary(string='Archivo (CSV/XLSX)', required=True)
+    filename = fields.Char(string='Nombre de Archivo')
+    payment_date = fields.Date(string='Fecha de Contabilización', required=True, default=fields.Date.today)
+    chunk_size = fields.Integer(string='Cuotas por Lote', required=True, default=500)
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('done', 'Procesado'),
+    ], default='draft', readonly=True)
+    line_ids = fields.One2many('loan.manager.repayment.import.line', 'wizard_id', string='Resultados', readonly=True)
+    paid_count = fields.Integer(string='Cuotas Pagadas', compute='_compute_counts')
+    error_count = fields.Integer(string='Filas con Error', compute='_compute_counts')
+
+    @api.depends('line_ids.status')
+    def _compute_counts(self):
+        for wizard in self:
+            wizard.error_count = len(wizard.line_ids.filtered(lambda line: line.status == 'error'))
+            wizard.paid_count = len(wizard.line_ids) - wizard.error_count
+
+    # Internal Methods
+    def _parse_rows(self):
+        content = base64.b64decode(self.file)
+        rows, seen = [], set()
+        for row_number, values in read_import_rows(content, self.filename, PAYMENT_IMPORT_COLUMNS):
+            row = {
+                'row_number': row_number,
+                'loan_reference': str(values['reference'] or '').strip(),
+                'sequence': 0,
+                'amount': 0.0,
+                'status': False,
+                'message': False,
+            }
+            rows.append(row)
+            try:
+                row['sequence'] = int(float(values['sequence']))
+                row['amount'] = parse_amount(values['amount'])
+            except (TypeError, ValueError):
+                row.update(status='error', message="Número de cuota o monto inválido.")
+                continue
+            if not row['loan_reference']:
+                row.update(status='error', message="Falta la referencia del préstamo.")
+            elif row['amount'] <= 0:
+                row.update(status='error', message="El monto a pagar debe ser mayor que 0.")
+            elif (row['loan_reference'], row['sequence']) in seen:
+                row.update(status='error', message="La cuota está duplicada en el archivo.")
+            seen.add((row['loan_reference'], row['sequence']))
+        return rows
+
+    def _match_rows(self, rows):
+        references = {row['loan_reference'] for row in rows if not row['status']}
+        loans = self.env['loan.manager.loan'].search([('reference', 'in', list(references))])
+        loans_by_reference = {loan.reference: loan for loan in loans}
+        # Installments of compact schedules are materialized up to the last one paid in the file before matching.
+        up_to = {}
+        for row in rows:
+            loan = loans_by_reference.get(row['loan_reference'])
+            if not row['status'] and loan and loan.projected_schedule:
+                up_to[loan.id] = max(up_to.get(loan.id, 0), row['sequence'])
+        loan_ids_by_sequence = {}
+        for loan_id, sequence in up_to.items():
+            loan_ids_by_sequence.setdefault(sequence, []).append(loan_id)
+        for sequence, loan_ids in loan_ids_by_sequence.items():
+            loans.browse(loan_ids)._materialize_installments(up_to=sequence)
+        repayments = {
+            (repayment.loan_id.id, repayment.sequence): repayment
+            for repayment in self.env['loan.manager.repayment'].search([('loan_id', 'in', loans.ids)])
+        }
+        unpaid_sequences = {}
+        for (loan_id, sequence), repayment in repayments.items():
+            if repayment.status in ('pending', 'extra'):
+                unpaid_sequences.setdefault(loan_id, []).append(sequence)
+
+        rows_by_loan = {}
+        for row in rows:
+            if row['status']:
+                continue
+            loan = loans_by_reference.get(row['loan_reference'])
+            if not loan:
+                row.update(status='error', message=f"No existe el préstamo {row['loan_reference']}.")
+                continue
+            repayment = repayments.get((loan.id, row['sequence']))
+            if not repayment:
+                row.update(status='error', message=f"El préstamo {loan.reference} no tiene la cuota #{row['sequence']}.")
+            elif loan.loan_status != 'disbursed' or repayment.status not in ('pending', 'extra'):
+                row.update(status='error', message="Solo puede pagar cuotas pendientes de préstamos desembolsados.")
+            else:
+                row['repayment'] = repayment
+                rows_by_loan.setdefault(loan.id, []).append(row)
+
+        ordered = []
+        for loan_id, loan_rows in rows_by_loan.items():
+            loan_rows.sort(key=lambda r: r['sequence'])
+            paid_in_file = {r['sequence'] for r in loan_rows}
+            blocked = False
+            for row in loan_rows:
+                missing = [s for s in unpaid_sequences.get(loan_id, []) if s < row['sequence'] and s not in paid_in_file]
+                if blocked or missing:
+                    blocked = True
+                    row.update(status='error', message=(
+                        f"La cuota #{min(missing)} aún está pendiente." if missing else "Una cuota anterior del préstamo no pudo pagarse."
+                    ))
+                    continue
+                ordered.append(row)
+        return ordered
+
+    def _post_row(self, row):
+        row['status'] = row['repayment']._register_payment(row['amount'], payment_date=self.payment_date)
+
+    def _is_full_payment(self, row):
+        # Same outcome as _register_payment marking the installment as paid, without a partial payment or prepayment.
+        repayment = row['repayment']
+        amount_due = repayment._get_amount_due()
+        if row['amount'] < amount_due:
+            return False
+        return row['amount'] == amount_due or repayment.loan_id.loan_type_id.reamortization_mode == 'extra'
+
+    def _post_chunk(self, chunk):
+        # Rows paying their whole installment are marked as paid in one call, so their payment moves are created and
+        # posted together. Once a loan has a partial payment or prepayment in the chunk, its following rows keep the
+        # row by row path so they are applied after it.
+        full_rows, other_rows = [], []
+        irregular_loan_ids = set()
+        for row in chunk:
+            loan_id = row['repayment'].loan_id.id
+            if loan_id not in irregular_loan_ids and self._is_full_payment(row):
+                full_rows.append(row)
+            else:
+                irregular_loan_ids.add(loan_id)
+                other_rows.append(row)
+        if full_rows:
+            repayments = self.env['loan.manager.repayment'].browse([row['repayment'].id for row in full_rows])
+            repayments.action_mark_as_paid(payment_date=self.payment_date)
+            for row in full_rows:
+                row['status'] = 'paid'
+        for row in other_rows:
+            self._post_row(row)
+
+    def _post_rows(self, rows):
+        chunk_size = max(self.chunk_size, 1)
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            try:
+                with self.env.cr.savepoint():
+                    self._post_chunk(chunk)
+                continue
+            except UserError:
+                self.env.invalidate_all()
+            for row in chunk:
+                row.update(status=False, message=False)
+                try:
+                    with self.env.cr.savepoint():
+                        self._post_row(row)
+                except UserError as error:
+                    self.env.invalidate_all()
+                    row.update(status='error', message=str(error.args[0] if error.args else error))
+
+    # Button Actions
+    def action_import(self):
+        self.ensure_one()
+        if self.state != 'draft':
+            raise ValidationError("Este archivo ya fue procesado.")
+        rows = self._parse_rows()
+        self._post_rows(self._match_rows(rows))
+        self.env['loan.manager.repayment.import.line'].create([{
+            'wizard_id': self.id,
+            'row_number': row['row_number'],
+            'loan_reference': row['loan_reference'],
+            'sequence': row['sequence'],
+            'amount': row['amount'],
+            'repayment_id': row['repayment'].id if row.get('repayment') and row['status'] != 'error' else False,
+            'status': row['status'] or 'error',
+            'message': row['message'],
+        } for row in rows])
+        self.state = 'done'
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+
+class LoanRepaymentImportLine(models.TransientModel):
+    """
+        DOCSTRING: LoanRepaymentImportLine transient model responsible for holding the result of each imported payment row.
+    """
+    _name = 'loan.manager.repayment.import.line'
+    _description = 'Resultado de Importación de Pagos'
+    _order = 'row_number'
+
+    wizard_id = fields.Many2one('loan.manager.repayment.import.wizard', required=True, ondelete='cascade')
+    row_number = fields.Integer(string='Fila')
+    loan_reference = fields.Char(string='Préstamo')
+    sequence = fields.Integer(string='Cuota')
+    amount = fields.Float(string='Monto')
+    repayment_id = fields.Many2one('loan.manager.repayment', string='Cuota Pagada')
+    status = fields.Selection([
+        ('paid', 'Pagado'),
+        ('partial', 'Parcial'),
+        ('error', 'Error'),
+    ], string='Resultado')
+    message = fields.Char(string='Detalle')
+
+
+class LoanImportWizard(models.TransientModel):
+    """
+        DOCSTRING: LoanImportWizard transient model responsible for creating loans in bulk from origination files.
+    """
+    _name = 'loan.manager.loan.import.wizard'
+    _description = 'Importar Préstamos'
+
+    file = fields.Binary(string='Archivo (CSV/XLSX/JSON)', required=True)
+    filename = fields.Char(string='Nombre de Archivo')
+    dry_run = fields.Boolean(string='Solo Validar', default=True, help='Valida el archivo y reporta los errores sin crear ningún préstamo.')
+    generate_repayments = fields.Boolean(string='Calcular Cuotas', default=True, help='Genera el plan de pagos de los préstamos creados en el mismo proceso.')
+    chunk_size = fields.Integer(string='Préstamos por Lote', required=True, default=200)
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('done', 'Procesado'),
+    ], default='draft', readonly=True)
+    line_ids = fields.One2many('loan.manager.loan.import.line', 'wizard_id', string='Resultados', readonly=True)
+    valid_count = fields.Integer(string='Filas Válidas', compute='_compute_counts')
+    error_count = fields.Integer(string='Filas con Error', compute='_compute_counts')
+
+    @api.depends('line_ids.status')
+    def _compute_counts(self):
+        for wizard in self:
+            wizard.error_count = len(wizard.line_ids.filtered(lambda line: line.status == 'error'))
+            wizard.valid_count = len(wizard.line_ids) - wizard.error_count
+
+    # Internal Methods
+    def _parse_rows(self):
+        content = base64.b64decode(self.file)
+        rows = []
+        for row_number, values in read_import_rows(content, self.filename, LOAN_IMPORT_COLUMNS):
+            row = {
+                'row_number': row_number,
+                'partner_name': str(values['partner'] or '').strip(),
+                'loan_type_name': str(values['loan_type'] or '').strip(),
+                'amount': 0.0,
+                'tenure': 0,
+                'status': False,
+                'message': False,
+            }
+            rows.append(row)
+            try:
+                row['amount'] = parse_amount(values['amount'])
+                row['tenure'] = int(float(values['tenure']))
+            except (TypeError, ValueError):
+                row.update(status='error', message="Monto o plazo inválido.")
+                continue
+            if not row['partner_name']:
+                row.update(status='error', message="Falta el cliente.")
+            elif not row['loan_type_name']:
+                row.update(status='error', message="Falta el tipo de préstamo.")
+        return rows
+
+    def _match_rows(self, rows):
+        pending = [row for row in rows if not row['status']]
+        loan_types = self.env['loan.manager.type'].search([
+            ('loan_name', 'in', list({row['loan_type_name'] for row in pending})),
+        ])
+        loan_types_by_name = {}
+        for loan_type in loan_types:
+            loan_types_by_name.setdefault(loan_type.loan_name, loan_type)
+
+        partner_keys = list({row['partner_name'] for row in pending})
+        partners = self.env['res.partner'].search(['|', ('vat', 'in', partner_keys), ('name', 'in', partner_keys)])
+        partners_by_key = {}
+        for partner in partners:
+            for key in {partner.vat, partner.name} - {False}:
+                partners_by_key.setdefault(key, set()).add(partner.id)
+
+        Loan = self.env['loan.manager.loan']
+        valid = []
+        for row in pending:
+            partner_ids = partners_by_key.get(row['partner_name'], set())
+            loan_type = loan_types_by_name.get(row['loan_type_name'])
+            if not partner_ids:
+                row.update(status='error', message=f"No existe el cliente {row['partner_name']}.")
+                continue
+            if len(partner_ids) > 1:
+                row.update(status='error', message=f"Hay varios clientes que coinciden con {row['partner_name']}.")
+                continue
+            if not loan_type:
+                row.update(status='error', message=f"No existe el tipo de préstamo {row['loan_type_name']}.")
+                continue
+            row['vals'] = {
+                'partner_id': next(iter(partner_ids)),
+                'loan_type_id': loan_type.id,
+                'loan_amount': row['amount'],
+                'tenure': row['tenure'],
+            }
+            try:
+                Loan._validate_loan_constraints(row['vals'], loan_type)
+            except ValidationError as error:
+                row.update(status='error', message=str(error.args[0] if error.args else error))
+                continue
+            valid.append(row)
+        return valid
+
+    def _create_chunk(self, rows):
+        loans = self.env['loan.manager.loan'].with_context(tracking_disable=True).create([row['vals'] for row in rows])
+        loans._log_bulk_creation(f"Préstamo creado por importación ({self.filename or 'archivo'}).")
+        if self.generate_repayments:
+            loans._generate_repayments()
+        for row, loan in zip(rows, loans):
+            row.update(status='created', loan=loan)
+
+    def _create_rows(self, rows):
+        chunk_size = max(self.chunk_size, 1)
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            try:
+                with self.env.cr.savepoint():
+                    self._create_chunk(chunk)
+                continue
+            except UserError:
+                self.env.invalidate_all()
+            for row in chunk:
+                try:
+                    with self.env.cr.savepoint():
+                        self._create_chunk([row])
+                except UserError as error:
+                    self.env.invalidate_all()
+                    row.update(status='error', message=str(error.args[0] if error.args else error))
+
+    # Button Actions
+    def action_import(self):
+        self.ensure_one()
+        if self.state != 'draft':
+            raise ValidationError("Este archivo ya fue procesado.")
+        rows = self._parse_rows()
+        valid = self._match_rows(rows)
+        if self.dry_run:
+            for row in valid:
+                row['status'] = 'valid'
+        else:
+            self._create_rows(valid)
+        self.env['loan.manager.loan.import.line'].create([{
+            'wizard_id': self.id,
+            'row_number': row['row_number'],
+            'partner_name': row['partner_name'],
+            'loan_type_name': row['loan_type_name'],
+            'amount': row['amount'],
+            'tenure': row['tenure'],
+            'loan_id': row['loan'].id if row.get('loan') else False,
+            'status': row['status'] or 'error',
+            'message': row['message'],
+        } for row in rows])
+        self.state = 'done'
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+
+class LoanImportLine(models.TransientModel):
+    """
+        DOCSTRING: LoanImportLine transient model responsible for holding the result of each imported loan row.
+    """
+    _name = 'loan.manager.loan.import.line'
+    _description = 'Resultado de Importación de Préstamos'
+    _order = 'row_number'
+
+    wizard_id = fields.Many2one('loan.manager.loan.import.wizard', required=True, ondelete='cascade')
+    row_number = fields.Integer(string='Fila')
+    partner_name = fields.Char(string='Cliente')
+    loan_type_name = fields.Char(string='Tipo de Préstamo')
+    amount = fields.Float(string='Monto')
+    tenure = fields.Integer(string='Plazo')
+    loan_id = fields.Many2one('loan.manager.loan', string='Préstamo Creado')
+    status = fields.Selection([
+        ('valid', 'Válido'),
+        ('created', 'Creado'),
+        ('error', 'Error'),
+    ], string='Resultado')
+    message = fields.Char(string='Detalle')
@@ -0,0 +1,37 @@
+from odoo import models, fields, api
+
+# Define your models here.
+
+
+class LoanPerfLog(models.Model):
+    """
+        DOCSTRING: LoanPerfLog model holds one row per instrumented call of the loan hot paths, kept for a rolling number of days.
+    """
+    _name = 'loan.manager.perf.log'
+    _description = 'Loan Performance Log'
+    _order = 'create_date desc, id desc'
+    _rec_name = 'method'
+
+    model = fields.Char(string='Modelo', readonly=True)
+    method = fields.Char(string='Método', readonly=True, index=True)
+    duration_ms = fields.Float(string='Duración (ms)', readonly=True, aggregator='avg')
+    query_count = fields.Integer(string='Consultas SQL', readonly=True, aggregator='avg')
+    record_count = fields.Integer(string='Registros', readonly=True, aggregator='avg')
+    create_date = fields.Datetime(string='Fecha', readonly=True, index=True)
+
+    @api.model
+    def _log_call(self, model, method, duration, query_count, record_count):
+        # Rows are inserted directly so logging adds a single query and no ORM overhead to the measured path.
+        self.env.cr.execute(f"""
+            INSERT INTO {self._table} (model, method, duration_ms, query_count, record_count, create_uid, create_date, write_uid, write_date)
+            VALUES (%s, %s, %s, %s, %s, %s, NOW() AT TIME ZONE 'UTC', %s, NOW() AT TIME ZONE 'UTC')
+        """, [model, method, round(duration * 1000.0, 3), query_count, record_count, self.env.uid, self.env.uid])
+
+    @api.model
+    def _cron_purge_logs(self):
+        retention_days = int(self.env['ir.config_parameter'].sudo().get_param('tel_capp_lm.perf_log_retention_days', 7))
+        self.env.cr.execute(
+            f"DELETE FROM {self._table} WHERE create_date < (NOW() AT TIME ZONE 'UTC') - %s * INTERVAL '1 day'",
+            [retention_days],
+        )
+        self.invalidate_model()
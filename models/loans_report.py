@@ -0,0 +1,226 @@
+from odoo import models, fields, api, tools
+
+# Define your models here.
+
+
+class LoanAgingReport(models.Model):
+    """
+        DOCSTRING: LoanAgingReport read-only model responsible for bucketing the overdue installments of disbursed loans by days past due.
+    """
+    _name = 'loan.manager.report.aging'
+    _description = 'Loan Portfolio at Risk Aging'
+    _auto = False
+    _rec_name = 'loan_id'
+    _order = 'days_overdue desc'
+
+    repayment_id = fields.Many2one('loan.manager.repayment', string='Cuota', readonly=True)
+    loan_id = fields.Many2one('loan.manager.loan', string='Prestamo', readonly=True)
+    loan_type_id = fields.Many2one('loan.manager.type', string='Tipo de Prestamo', readonly=True)
+    partner_id = fields.Many2one('res.partner', string='Cliente', readonly=True)
+    company_id = fields.Many2one('res.company', string='Empresa', readonly=True)
+    due_date = fields.Date(string='Fecha de Pago', readonly=True)
+    days_overdue = fields.Integer(string='Días de Atraso', readonly=True, aggregator='max')
+    aging_bucket = fields.Selection([
+        ('1_30', '1-30 días'),
+        ('31_60', '31-60 días'),
+        ('61_90', '61-90 días'),
+        ('90_plus', 'Más de 90 días'),
+    ], string='Antigüedad', readonly=True)
+    principal = fields.Float(string='Capital Vencido', readonly=True)
+    interest = fields.Float(string='Interés Vencido', readonly=True)
+    total_overdue = fields.Float(string='Total Vencido', readonly=True)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+                SELECT r.id AS id,
+                       r.id AS repayment_id,
+                       r.loan_id AS loan_id,
+                       l.loan_type_id AS loan_type_id,
+                       l.partner_id AS partner_id,
+                       l.company_id AS company_id,
+                       r.due_date AS due_date,
+                       CURRENT_DATE - r.due_date AS days_overdue,
+                       CASE
+                           WHEN CURRENT_DATE - r.due_date <= 30 THEN '1_30'
+                           WHEN CURRENT_DATE - r.due_date <= 60 THEN '31_60'
+                           WHEN CURRENT_DATE - r.due_date <= 90 THEN '61_90'
+                           ELSE '90_plus'
+                       END AS aging_bucket,
+                       r.principal AS principal,
+                       r.interest AS interest,
+                       r.principal + r.interest AS total_overdue
+                  FROM loan_manager_repayment r
+                  JOIN loan_manager_loan l ON l.id = r.loan_id
+                 WHERE l.loan_status = 'disbursed'
+                   AND r.status IN ('pending', 'extra')
+                   AND r.due_date < CURRENT_DATE
+            )
+        """)
+
+
+class LoanPortfolioSnapshot(models.Model):
+    """
+        DOCSTRING: LoanPortfolioSnapshot model holds one pre-aggregated row of portfolio figures per date, company and loan type.
+    """
+    _name = 'loan.manager.portfolio.snapshot'
+    _description = 'Loan Portfolio Daily Snapshot'
+    _rec_name = 'date'
+    _order = 'date desc, company_id, loan_type_id'
+
+    date = fields.Date(string='Fecha', required=True, readonly=True, index=True)
+    company_id = fields.Many2one('res.company', string='Empresa', required=True, readonly=True)
+    loan_type_id = fields.Many2one('loan.manager.type', string='Tipo de Prestamo', required=True, readonly=True, ondelete='cascade')
+    outstanding_principal = fields.Float(string='Capital Pendiente', readonly=True)
+    disbursed_amount = fields.Float(string='Monto Desembolsado', readonly=True)
+    collections = fields.Float(string='Cobros', readonly=True)
+    overdue_amount = fields.Float(string='Monto Vencido', readonly=True)
+    active_loan_count = fields.Integer(string='Préstamos Activos', readonly=True)
+
+    _sql_constraints = [
+        ('unique_snapshot_date_company_type', 'UNIQUE(date, company_id, loan_type_id)', 'Solo puede existir una instantánea por fecha, empresa y tipo de préstamo.'),
+    ]
+
+    @api.model
+    def _generate_snapshots(self, date_from=None, date_to=None):
+        # Figures are rebuilt as of each date from payment and disbursement dates, so any past date can be
+        # regenerated. An installment paid after the date was still outstanding on it, and so was a projected or
+        # materialized one whatever its creation date. Only the installments split off by a later partial payment
+        # are left out, their principal was still part of the partially paid installment. Existing rows for
+        # the date are replaced, which makes every run idempotent.
+        date_from = fields.Date.to_date(date_from) or fields.Date.context_today(self)
+        date_to = fields.Date.to_date(date_to) or date_from
+        self.env['loan.manager.loan'].flush_model()
+        self.env['loan.manager.repayment'].flush_model()
+        self.env['account.move'].flush_model(['date'])
+        snapshot_date = date_from
+        while snapshot_date <= date_to:
+            self.env.cr.execute(f"DELETE FROM {self._table} WHERE date = %s", [snapshot_date])
+            self.env.cr.execute(f"""
+                WITH loans AS (
+                    SELECT l.id, l.company_id, l.loan_type_id, l.disburse_amount, COALESCE(l.projected_principal, 0.0) AS projected_principal, m.date AS disbursed_on
+                      FROM loan_manager_loan l
+                      JOIN account_move m ON m.id = l.disburse_move_id
+                     WHERE l.loan_status = 'disbursed'
+                       AND m.date <= %(date)s
+                ),
+                installments AS (
+                    SELECT r.loan_id,
+                           SUM(r.principal) FILTER (WHERE r.status IN ('pending', 'extra') OR r.payment_date > %(date)s) AS outstanding,
+                           SUM(CASE WHEN r.status = 'partial' THEN r.amount_paid ELSE r.principal + r.interest + COALESCE(r.late_fee, 0.0) END)
+                               FILTER (WHERE r.status IN ('paid', 'partial') AND r.payment_date = %(date)s) AS collections,
+                           SUM(r.principal + r.interest)
+                               FILTER (WHERE r.due_date < %(date)s AND (r.status IN ('pending', 'extra') OR r.payment_date > %(date)s)) AS overdue
+                      FROM loan_manager_repayment r
+                      JOIN loans ON loans.id = r.loan_id
+                     WHERE NOT (r.is_split AND r.create_date::date > %(date)s)
+                  GROUP BY r.loan_id
+                )
+                INSERT INTO {self._table} (
+                    date, company_id, loan_type_id, outstanding_principal, disbursed_amount, collections,
+                    overdue_amount, active_loan_count, create_uid, create_date, write_uid, write_date
+                )
+                SELECT %(date)s,
+                       loans.company_id,
+                       loans.loan_type_id,
+                       COALESCE(SUM(i.outstanding), 0.0) + COALESCE(SUM(loans.projected_principal), 0.0),
+                       COALESCE(SUM(loans.disburse_amount) FILTER (WHERE loans.disbursed_on = %(date)s), 0.0),
+                       COALESCE(SUM(i.collections), 0.0),
+                       COALESCE(SUM(i.overdue), 0.0),
+                       COUNT(*) FILTER (WHERE i.outstanding > 0 OR loans.projected_principal > 0),
+                       %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+                  FROM loans
+             LEFT JOIN installments i ON i.loan_id = loans.id
+              GROUP BY loans.company_id, loans.loan_type_id
+            """, {'date': snapshot_date, 'uid': self.env.uid})
+            snapshot_date = fields.Date.add(snapshot_date, days=1)
+        self.invalidate_model()
+
+    @api.model
+    def _cron_generate_snapshots(self):
+        self._generate_snapshots()
+
+
+class LoanRepaymentAnalysis(models.Model):
+    """
+        DOCSTRING: LoanRepaymentAnalysis read-only model responsible for exposing installments flattened with their loan, type and partner columns.
+    """
+    _name = 'loan.manager.report.repayment'
+    _description = 'Loan Repayment Analysis'
+    _auto = False
+    _rec_name = 'reference'
+    _order = 'due_date desc, id desc'
+
+    reference = fields.Char(string='Referencia', readonly=True)
+    repayment_id = fields.Many2one('loan.manager.repayment', string='Cuota', readonly=True)
+    loan_id = fields.Many2one('loan.manager.loan', string='Prestamo', readonly=True)
+    sequence = fields.Integer(string='Número de Cuota', readonly=True, aggregator=False)
+    due_date = fields.Date(string='Fecha de Pago', readonly=True)
+    payment_date = fields.Date(string='Fecha de Contabilización', readonly=True)
+    status = fields.Selection([
+        ('pending', 'Pendiente'),
+        ('paid', 'Pagado'),
+        ('partial', 'Parcial'),
+        ('extra', 'Extra'),
+    ], string='Estado de Cuota', readonly=True)
+    loan_status = fields.Selection([
+        ('draft', 'Borrador'),
+        ('confirmed', 'Confirmado'),
+        ('pending', 'Pendiente'),
+        ('approved', 'Aprobado'),
+        ('registered', 'Contabilizado'),
+        ('disbursed', 'Desembolsado'),
+        ('declined', 'Denegado')
+    ], string='Estado de Prestamo', readonly=True)
+    loan_type_id = fields.Many2one('loan.manager.type', string='Tipo de Prestamo', readonly=True)
+    amortization_method = fields.Selection([
+        ('french', 'Cuota Nivelada'),
+        ('german', 'Cuota Sobre Saldos Insolutos')
+    ], string='Método de Amortización', readonly=True)
+    tenure_plan = fields.Selection([
+        ('monthly', 'Mensual'),
+        ('biweekly', 'Quincenal'),
+        ('weekly', 'Semanal'),
+    ], string='Plan de Pago', readonly=True)
+    partner_id = fields.Many2one('res.partner', string='Cliente', readonly=True)
+    commercial_partner_id = fields.Many2one('res.partner', string='Entidad Comercial', readonly=True)
+    company_id = fields.Many2one('res.company', string='Empresa', readonly=True)
+    principal = fields.Float(string='Capital', readonly=True)
+    interest = fields.Float(string='Interés', readonly=True)
+    total_payment = fields.Float(string='Pago Total', readonly=True)
+    amount_paid = fields.Float(string='Monto Pagado', readonly=True)
+    remaining_balance = fields.Float(string='Saldo Restante', readonly=True, aggregator=False)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+                SELECT r.id AS id,
+                       r.reference AS reference,
+                       r.id AS repayment_id,
+                       r.loan_id AS loan_id,
+                       r.sequence AS sequence,
+                       r.due_date AS due_date,
+                       r.payment_date AS payment_date,
+                       r.status AS status,
+                       l.loan_status AS loan_status,
+                       l.loan_type_id AS loan_type_id,
+                       l.amortization_method AS amortization_method,
+                       l.tenure_plan AS tenure_plan,
+                       l.partner_id AS partner_id,
+                       p.commercial_partner_id AS commercial_partner_id,
+                       l.company_id AS company_id,
+                       r.principal AS principal,
+                       r.interest AS interest,
+                       r.total_payment AS total_payment,
+                       CASE
+                           WHEN r.status = 'paid' THEN r.total_payment
+                           ELSE COALESCE(r.amount_paid, 0.0)
+                       END AS amount_paid,
+                       r.remaining_balance AS remaining_balance
+                  FROM loan_manager_repayment r
+                  JOIN loan_manager_loan l ON l.id = r.loan_id
+                  JOIN res_partner p ON p.id = l.partner_id
+            )
+        """)
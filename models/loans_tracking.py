@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+from markupsafe import Markup
+from odoo import models
+
+# Define your models here.
+
+
+class LoanBulkTrackingMixin(models.AbstractModel):
+    """
+        DOCSTRING: LoanBulkTrackingMixin abstract model responsible for collapsing the field tracking of mass operations into one summary message per record.
+    """
+    _name = 'loan.manager.bulk.tracking.mixin'
+    _description = 'Loan Bulk Tracking Mixin'
+
+    @contextmanager
+    def _bulk_tracking(self, operation):
+        # Tracked values are read once before the operation. During it only the writes on this model skip
+        # tracking, records of other models such as the posted moves keep their own tracking and chatter.
+        # Afterwards every record that changed gets a single message listing all its changes, created in one batch.
+        if len(self) < 2:
+            yield self.with_context(loan_bulk_tracking=False)
+            return
+        tracked = [name for name in self._track_get_fields() if name in self._fields]
+        initial = {record.id: {name: record[name] for name in tracked} for record in self}
+        yield self.with_context(loan_bulk_tracking=False, loan_bulk_tracking_model=self._name)
+        bodies = {}
+        for record in self.exists():
+            changes = [
+                (self._fields[name].string, self._get_bulk_tracking_display(name, initial[record.id][name]), self._get_bulk_tracking_display(name, record[name]))
+                for name in tracked if initial[record.id][name] != record[name]
+            ]
+            if changes:
+                bodies[record.id] = self._get_bulk_tracking_body(operation, changes)
+        if bodies:
+            self.browse(list(bodies))._message_log_batch(bodies=bodies)
+
+    def _is_bulk_tracking_write(self):
+        context = self.env.context
+        return bool(context.get('loan_bulk_tracking')) or context.get('loan_bulk_tracking_model') == self._name
+
+    def _write_with_bulk_tracking(self, vals):
+        if self.env.context.get('loan_bulk_tracking_model') == self._name:
+            return self.with_context(tracking_disable=True, loan_bulk_tracking_model=False).write(vals)
+        with self._bulk_tracking(self.env.context['loan_bulk_tracking']) as records:
+            return records.write(vals)
+
+    def _log_bulk_creation(self, operation):
+        if self:
+            self._message_log_batch(bodies={record.id: Markup('<p>%s</p>') % operation for record in self})
+
+    def _get_bulk_tracking_display(self, field_name, value):
+        field = self._fields[field_name]
+        if field.type in ('many2one', 'many2many', 'one2many'):
+            return ', '.join(value.mapped('display_name')) or '-'
+        if field.type == 'selection':
+            return dict(field._description_selection(self.env)).get(value) or '-'
+        if field.type == 'boolean':
+            return 'Sí' if value else 'No'
+        return '-' if value is False or value is None else str(value)
+
+    def _get_bulk_tracking_body(self, operation, changes):
+        items = Markup('').join(Markup('<li>%s: %s → %s</li>') % change for change in changes)
+        return Markup('<p>%s</p><ul>%s</ul>') % (operation, items)
@@ -15,17 +15,74 @@ class ResPartner(models.Model):
 
     loan_remaining_total = fields.Float(
         string='Saldo Pendiente Total',
-        compute='_compute_loan_remaining_total',
+        compute='_compute_loan_exposure',
+        store=True,
+        readonly=True
+    )
+    loan_active_count = fields.Integer(
+        string='Préstamos Activos',
+        compute='_compute_loan_exposure',
+        store=True,
+        readonly=True
+    )
+    loan_next_due_date = fields.Date(
+        string='Próximo Vencimiento',
+        compute='_compute_loan_exposure',
+        store=True,
+        readonly=True
+    )
+    loan_overdue_amount = fields.Float(
+        string='Monto en Mora',
+        compute='_compute_loan_exposure',
+        store=True,
         readonly=True
     )
 
-    @api.depends('loan_ids.loan_repayment_ids.status', 'loan_ids.loan_repayment_ids.remaining_balance')
-    def _compute_loan_remaining_total(self):
+    @api.depends('loan_ids.loan_status', 'loan_ids.projected_principal', 'loan_ids.loan_repayment_ids.status', 'loan_ids.loan_repayment_ids.late_fee', 'loan_ids.loan_repayment_ids.principal', 'loan_ids.loan_repayment_ids.due_date')
+    def _compute_loan_exposure(self):
+        exposure = {}
+        projected = {}
+        partner_ids = [partner_id for partner_id in self._origin.ids if partner_id]
+        if partner_ids:
+            self.env['loan.manager.repayment'].flush_model(
+                ['partner_id', 'loan_id', 'loan_status', 'status', 'principal', 'due_date', 'total_payment', 'late_fee']
+            )
+            self.env.cr.execute("""
+                SELECT partner_id,
+                       SUM(principal + COALESCE(late_fee, 0.0)),
+                       COUNT(DISTINCT loan_id),
+                       MIN(due_date),
+                       COALESCE(SUM(total_payment + COALESCE(late_fee, 0.0)) FILTER (WHERE due_date < %s), 0.0)
+                  FROM loan_manager_repayment
+                 WHERE partner_id = ANY(%s)
+                   AND loan_status = 'disbursed'
+                   AND status IN ('pending', 'extra')
+              GROUP BY partner_id
+            """, [fields.Date.context_today(self), partner_ids])
+            exposure = {row[0]: row[1:] for row in self.env.cr.fetchall()}
+            # Loans with a compact schedule keep their future principal on the loan until it is materialized.
+            self.env['loan.manager.loan'].flush_model(['partner_id', 'loan_status', 'projected_principal'])
+            self.env.cr.execute("""
+                SELECT partner_id, SUM(projected_principal)
+                  FROM loan_manager_loan
+                 WHERE partner_id = ANY(%s)
+                   AND loan_status = 'disbursed'
+                   AND projected_principal > 0
+              GROUP BY partner_id
+            """, [partner_ids])
+            projected = dict(self.env.cr.fetchall())
         for partner in self:
-            total = 0.0
-            for loan in partner.loan_ids:
-                if loan.loan_status == 'disbursed':
-                    for rep in loan.loan_repayment_ids:
-                        if rep.status in ['pending', 'extra']:
-                            total += rep.principal
-            partner.loan_remaining_total = total
\ No newline at end of file
+            remaining, active_count, next_due_date, overdue = exposure.get(partner._origin.id, (0.0, 0, False, 0.0))
+            partner.loan_remaining_total = (remaining or 0.0) + projected.get(partner._origin.id, 0.0)
+            partner.loan_active_count = active_count
+            partner.loan_next_due_date = next_due_date
+            partner.loan_overdue_amount = overdue
+
+    @api.model
+    def _cron_refresh_loan_exposure(self):
+        # Marking the fields as to compute lets the flush store every partner in batched UPDATEs, calling the
+        # compute method directly would write each field of each partner separately.
+        partners = self.search([('loan_active_count', '>', 0)])
+        for field_name in ('loan_remaining_total', 'loan_active_count', 'loan_next_due_date', 'loan_overdue_amount'):
+            self.env.add_to_compute(self._fields[field_name], partners)
+        partners.flush_model(['loan_remaining_total', 'loan_active_count', 'loan_next_due_date', 'loan_overdue_amount'])
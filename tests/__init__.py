@@ -0,0 +1,4 @@
+from . import test_amortization
+from . import test_loan_performance
+from . import test_loan_terms
+from . import test_loan_repayments
@@ -0,0 +1,60 @@
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+
+class LoanManagerCommon(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.loan_type = cls.env['loan.manager.type'].create(cls._prepare_loan_type_vals())
+        cls.partner = cls.env['res.partner'].create({'name': 'Asociado de Prueba'})
+
+    @classmethod
+    def _prepare_loan_type_vals(cls, **overrides):
+        Account = cls.env['account.account']
+
+        def _account(code, name, account_type):
+            account = Account.search([('code', '=', code), ('company_ids', 'in', cls.env.company.id)], limit=1)
+            return account or Account.create({'code': code, 'name': name, 'account_type': account_type})
+
+        bank_account = cls.company_data['default_journal_bank'].default_account_id
+        return dict({
+            'loan_name': 'Préstamo de Prueba',
+            'max_amount': 1000000.0,
+            'max_tenure': 120,
+            'tenure_plan': 'monthly',
+            'amortization_method': 'french',
+            'interest_rate': 12.0,
+            'disburse_commission': 1.0,
+            'anticipated_payment_commission': 2.0,
+            'legal_expenses': 10.0,
+            'life_insurance': 5.0,
+            'loan_account': _account('LM1301', 'Préstamos por Cobrar', 'asset_current').id,
+            'payment_account': bank_account.id,
+            'interest_account': _account('LM4101', 'Intereses sobre Préstamos', 'income').id,
+            'disburse_account': _account('LM2101', 'Provisión de Desembolsos', 'liability_current').id,
+            'disburse_bank_account': bank_account.id,
+            'disburse_commission_account': _account('LM4102', 'Comisiones por Desembolso', 'income').id,
+            'anticipated_payment_commission_account': _account('LM4103', 'Comisiones por Pago Anticipado', 'income').id,
+            'legal_expenses_account': _account('LM2102', 'Gastos Legales por Pagar', 'liability_current').id,
+            'life_insurance_account': _account('LM2103', 'Seguro de Vida por Pagar', 'liability_current').id,
+            'register_journal_id': cls.company_data['default_journal_misc'].id,
+            'disburse_journal_id': cls.company_data['default_journal_bank'].id,
+            'payment_journal_id': cls.company_data['default_journal_bank'].id,
+        }, **overrides)
+
+    @classmethod
+    def _create_disbursed_loan(cls, **vals):
+        loan = cls.env['loan.manager.loan'].create(dict({
+            'partner_id': cls.partner.id,
+            'loan_type_id': cls.loan_type.id,
+            'loan_amount': 5000.0,
+            'tenure': 12,
+        }, **vals))
+        loan.action_calculate_repayments()
+        loan.action_confirmed()
+        loan.action_pending()
+        loan.action_approved()
+        loan.action_registered()
+        loan.action_disbursed()
+        return loan
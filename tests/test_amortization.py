@@ -0,0 +1,65 @@
+from datetime import date
+
+from odoo.tests.common import BaseCase
+
+from odoo.addons.tel_capp_lm.tools import amortization
+
+
+class TestAmortizationEngine(BaseCase):
+
+    def _python_schedule(self, principal, periods, annual_rate, method):
+        return amortization._amortize_python(principal, periods, amortization.period_rate(annual_rate), method)
+
+    def test_schedule_repays_principal(self):
+        for method in ('french', 'german'):
+            schedule = amortization.build_schedule(10000.0, 24, 18.0, date(2025, 1, 15), method=method)
+            self.assertEqual(len(schedule), 24)
+            self.assertEqual(schedule.sequence, list(range(1, 25)))
+            self.assertAlmostEqual(sum(schedule.principal), 10000.0, delta=0.005 * len(schedule))
+            self.assertEqual(schedule.remaining_balance[-1], 0.0)
+
+    def test_zero_rate(self):
+        schedule = amortization.build_schedule(1200.0, 12, 0.0, date(2025, 1, 1))
+        self.assertEqual(set(schedule.principal), {100.0})
+        self.assertEqual(set(schedule.interest), {0.0})
+
+    def test_batch_matches_single_loan_loop(self):
+        terms = [{
+            'principal': 1000.0 + 137.35 * index,
+            'periods': (6, 12, 36)[index % 3],
+            'annual_rate': 7.5 + index % 11,
+            'start_date': date(2025, 1, 1 + index % 28),
+            'method': ('french', 'german')[index % 2],
+        } for index in range(200)]
+        schedules = amortization.build_schedules(terms)
+        self.assertEqual(len(schedules), len(terms))
+        for term, schedule in zip(terms, schedules):
+            expected = self._python_schedule(term['principal'], term['periods'], term['annual_rate'], term['method'])
+            self.assertEqual((schedule.principal, schedule.interest, schedule.remaining_balance), expected)
+            self.assertEqual(schedule.due_date[0], amortization.due_dates(term['start_date'], 1)[0])
+
+    def test_due_dates_follow_plan(self):
+        start = date(2025, 1, 31)
+        self.assertEqual(amortization.due_dates(start, 2, 'monthly'), [date(2025, 2, 28), date(2025, 3, 31)])
+        self.assertEqual(amortization.due_dates(start, 2, 'biweekly'), [date(2025, 2, 14), date(2025, 2, 28)])
+        self.assertEqual(amortization.due_dates(start, 1, 'weekly'), [date(2025, 2, 7)])
+
+    def test_invalid_periods(self):
+        with self.assertRaises(ValueError):
+            amortization.build_schedules([{'principal': 100.0, 'periods': 0, 'annual_rate': 10.0, 'start_date': date(2025, 1, 1)}])
+
+    def test_fixed_installment_shortens_term(self):
+        principals, interests, balances = amortization.amortize_fixed_installment(1000.0, 100.0, 12.0)
+        self.assertEqual(len(principals), 11)
+        self.assertAlmostEqual(sum(principals), 1000.0, delta=0.01)
+        self.assertEqual(balances[-1], 0.0)
+        self.assertLess(principals[-1] + interests[-1], 100.0)
+
+    def test_fixed_installment_must_cover_interest(self):
+        with self.assertRaises(ValueError):
+            amortization.amortize_fixed_installment(100000.0, 500.0, 12.0)
+
+    def test_amortize_keeps_term(self):
+        principals, _interests, balances = amortization.amortize(1000.0, 6, 12.0)
+        self.assertEqual(len(principals), 6)
+        self.assertEqual(balances[-1], 0.0)
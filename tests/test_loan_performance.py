@@ -0,0 +1,204 @@
+import json
+import math
+import os
+import tempfile
+import time
+
+from odoo import fields
+from odoo.tests import tagged
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+# Number of loans seeded for the scaling measurements, and where the timings are written.
+PORTFOLIO_SIZE = int(os.environ.get('LOAN_PERF_PORTFOLIO_SIZE', 20))
+REPORT_PATH = os.environ.get('LOAN_PERF_REPORT', os.path.join(tempfile.gettempdir(), 'tel_capp_lm_loan_perf.json'))
+# With LOAN_PERF_CALIBRATE=1 the budgets are not asserted: the report lists the measured counts and the budgets to
+# set, that is the measured count plus QUERY_MARGIN (whole loan) or PER_LOAN_MARGIN (per additional loan).
+CALIBRATE = os.environ.get('LOAN_PERF_CALIBRATE') == '1'
+QUERY_MARGIN = 3
+PER_LOAN_MARGIN = 0.5
+
+# Query budgets for each lifecycle step run on a single loan (assertQueryCount), and the number of queries every
+# additional loan of a batch may add. Steps that post one move per loan are allowed a per-loan cost, the others
+# must stay close to constant whatever the batch size. The suite is left out of the standard run until the budgets
+# are calibrated on the target build: run it with --test-tags loan_perf and LOAN_PERF_CALIBRATE=1, copy the budgets
+# from the report, and then drop '-standard' from the tags. Recalibrate whenever a step legitimately changes its
+# queries.
+QUERY_BUDGETS = {
+    'create': 30,
+    'calculate_repayments': 15,
+    'confirm_request_approve': 40,
+    'register': 70,
+    'disburse': 60,
+    'mark_as_paid': 70,
+}
+PER_LOAN_BUDGETS = {
+    'create': 4,
+    'calculate_repayments': 1,
+    'confirm_request_approve': 2,
+    'register': 25,
+    'disburse': 20,
+    'mark_as_paid': 15,
+}
+
+
+@tagged('post_install', '-at_install', '-standard', 'loan_perf')
+class TestLoanLifecyclePerformance(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.timings = {}
+        cls.calibration = {}
+        Account = cls.env['account.account']
+
+        def _account(code, name, account_type):
+            return Account.create({'code': code, 'name': name, 'account_type': account_type})
+
+        bank_account = cls.company_data['default_journal_bank'].default_account_id
+        cls.loan_type = cls.env['loan.manager.type'].create({
+            'loan_name': 'Préstamo de Prueba',
+            'max_amount': 1000000.0,
+            'max_tenure': 120,
+            'tenure_plan': 'monthly',
+            'amortization_method': 'french',
+            'interest_rate': 12.0,
+            'disburse_commission': 1.0,
+            'anticipated_payment_commission': 2.0,
+            'legal_expenses': 10.0,
+            'life_insurance': 5.0,
+            'loan_account': _account('LM1301', 'Préstamos por Cobrar', 'asset_current').id,
+            'payment_account': bank_account.id,
+            'interest_account': _account('LM4101', 'Intereses sobre Préstamos', 'income').id,
+            'disburse_account': _account('LM2101', 'Provisión de Desembolsos', 'liability_current').id,
+            'disburse_bank_account': bank_account.id,
+            'disburse_commission_account': _account('LM4102', 'Comisiones por Desembolso', 'income').id,
+            'anticipated_payment_commission_account': _account('LM4103', 'Comisiones por Pago Anticipado', 'income').id,
+            'legal_expenses_account': _account('LM2102', 'Gastos Legales por Pagar', 'liability_current').id,
+            'life_insurance_account': _account('LM2103', 'Seguro de Vida por Pagar', 'liability_current').id,
+            'register_journal_id': cls.company_data['default_journal_misc'].id,
+            'disburse_journal_id': cls.company_data['default_journal_bank'].id,
+            'payment_journal_id': cls.company_data['default_journal_bank'].id,
+        })
+        cls.partners = cls.env['res.partner'].create([
+            {'name': f'Asociado {index}'} for index in range(PORTFOLIO_SIZE)
+        ])
+        # Warm up the registry and ORM caches so the measured runs only count the work of each step.
+        cls._run_lifecycle(cls._prepare_loan_vals(1))
+
+    @classmethod
+    def tearDownClass(cls):
+        with open(REPORT_PATH, 'w', encoding='utf-8') as report:
+            json.dump({
+                'portfolio_size': PORTFOLIO_SIZE,
+                'steps': cls.timings,
+                'calibration': cls.calibration,
+            }, report, indent=2, sort_keys=True)
+        super().tearDownClass()
+
+    @classmethod
+    def _prepare_loan_vals(cls, count):
+        return [{
+            'partner_id': cls.partners[index % len(cls.partners)].id,
+            'loan_type_id': cls.loan_type.id,
+            'loan_amount': 5000.0 + index,
+            'tenure': 12,
+        } for index in range(count)]
+
+    @classmethod
+    def _step_create(cls, vals_list):
+        return cls.env['loan.manager.loan'].create(vals_list)
+
+    @classmethod
+    def _step_calculate_repayments(cls, loans):
+        loans.action_calculate_repayments()
+        return loans
+
+    @classmethod
+    def _step_confirm_request_approve(cls, loans):
+        loans.action_confirmed()
+        loans.action_pending()
+        loans.action_approved()
+        return loans
+
+    @classmethod
+    def _step_register(cls, loans):
+        loans.action_registered()
+        return loans
+
+    @classmethod
+    def _step_disburse(cls, loans):
+        loans.action_disbursed()
+        return loans
+
+    @classmethod
+    def _step_mark_as_paid(cls, loans):
+        loans.next_repayment_id.action_mark_as_paid(payment_date=fields.Date.today())
+        return loans
+
+    @classmethod
+    def _lifecycle_steps(cls):
+        return [(step, getattr(cls, f'_step_{step}')) for step in QUERY_BUDGETS]
+
+    @classmethod
+    def _run_lifecycle(cls, vals_list):
+        records = vals_list
+        for _step, call in cls._lifecycle_steps():
+            records = call(records)
+        return records
+
+    def _measure_lifecycle(self, vals_list):
+        measures = {}
+        records = vals_list
+        for step, call in self._lifecycle_steps():
+            self.env.flush_all()
+            queries = self.cr.sql_log_count
+            start = time.perf_counter()
+            records = call(records)
+            self.env.flush_all()
+            measures[step] = (self.cr.sql_log_count - queries, time.perf_counter() - start)
+        return measures
+
+    def _calibrate(self, step, key, measured, margin):
+        self.calibration.setdefault(step, {}).update({
+            key: measured,
+            f'{key}_budget': math.ceil(measured + margin),
+        })
+
+    def test_lifecycle_query_budgets(self):
+        if CALIBRATE:
+            for step, (queries, _seconds) in self._measure_lifecycle(self._prepare_loan_vals(1)).items():
+                self._calibrate(step, 'queries', queries, QUERY_MARGIN)
+            return
+        records = self._prepare_loan_vals(1)
+        for step, call in self._lifecycle_steps():
+            with self.subTest(step=step), self.assertQueryCount(QUERY_BUDGETS[step]):
+                records = call(records)
+        loan = records
+        self.assertEqual(loan.loan_status, 'disbursed')
+        self.assertEqual(loan.loan_repayment_ids.sorted('sequence')[:1].status, 'paid')
+
+    def test_lifecycle_scaling(self):
+        small = self._measure_lifecycle(self._prepare_loan_vals(2))
+        large = self._measure_lifecycle(self._prepare_loan_vals(PORTFOLIO_SIZE))
+        extra_loans = max(PORTFOLIO_SIZE - 2, 1)
+        for step, (large_queries, large_seconds) in large.items():
+            small_queries, small_seconds = small[step]
+            per_loan = (large_queries - small_queries) / extra_loans
+            self.timings[step] = {
+                'loans': PORTFOLIO_SIZE,
+                'queries': large_queries,
+                'queries_per_extra_loan': round(per_loan, 2),
+                'seconds': round(large_seconds, 4),
+                'seconds_per_loan': round(large_seconds / PORTFOLIO_SIZE, 6),
+                'baseline_queries': small_queries,
+                'baseline_seconds': round(small_seconds, 4),
+            }
+            if CALIBRATE:
+                self._calibrate(step, 'queries_per_extra_loan', round(per_loan, 2), PER_LOAN_MARGIN)
+                continue
+            with self.subTest(step=step):
+                self.assertLessEqual(
+                    per_loan, PER_LOAN_BUDGETS[step],
+                    f"{step}: {per_loan:.1f} queries per additional loan exceed the budget of {PER_LOAN_BUDGETS[step]}.",
+                )
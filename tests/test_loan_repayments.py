@@ -0,0 +1,74 @@
+from odoo import fields
+from odoo.tests import tagged
+
+from odoo.addons.tel_capp_lm.tests.common import LoanManagerCommon
+
+
+@tagged('post_install', '-at_install')
+class TestLoanRepayments(LoanManagerCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.keep_term_type = cls.env['loan.manager.type'].create(cls._prepare_loan_type_vals(
+            loan_name='Préstamo Reamortizable',
+            reamortization_mode='keep_term',
+        ))
+
+    def test_prepayment_is_counted_as_paid_principal(self):
+        loan = self._create_disbursed_loan(loan_type_id=self.keep_term_type.id)
+        first = loan.next_repayment_id
+        excess = 1000.0
+        amount = first._get_amount_due() + excess
+        original_principal = first.principal
+
+        first._register_payment(amount, payment_date=fields.Date.today())
+
+        self.assertEqual(first.status, 'paid')
+        self.assertAlmostEqual(first.principal, original_principal + excess, places=2)
+        self.assertAlmostEqual(first.total_payment, amount, places=2)
+        self.assertAlmostEqual(loan.amount_paid, amount, places=2)
+        self.assertAlmostEqual(sum(first.move_id.line_ids.mapped('debit')), amount, places=2)
+        pending = loan.loan_repayment_ids.filtered(lambda repayment: repayment.status in ('pending', 'extra'))
+        self.assertAlmostEqual(sum(pending.mapped('principal')), loan.loan_amount - first.principal, delta=0.05)
+        self.assertAlmostEqual(first.remaining_balance, loan.loan_amount - first.principal, delta=0.05)
+
+    def test_compact_schedule_settles_without_materializing(self):
+        compact_type = self.env['loan.manager.type'].create(self._prepare_loan_type_vals(
+            loan_name='Préstamo Compacto',
+            schedule_storage='compact',
+        ))
+        loan = self._create_disbursed_loan(loan_type_id=compact_type.id)
+        self.assertEqual(len(loan.loan_repayment_ids), 1)
+        self.assertEqual(len(loan._get_projected_rows()), 11)
+
+        quote = loan._get_payoff_quotes(fields.Date.today())[loan.id]
+        loan._settle_loans(fields.Date.today())
+
+        self.assertEqual(len(loan.loan_repayment_ids), 2)
+        self.assertEqual(set(loan.loan_repayment_ids.mapped('status')), {'paid'})
+        self.assertFalse(loan.projected_schedule)
+        self.assertAlmostEqual(sum(loan.loan_repayment_ids.mapped('principal')), loan.loan_amount, delta=0.05)
+        self.assertAlmostEqual(loan.settlement_move_id.amount_total, quote['total'], places=2)
+        self.assertEqual(loan.amount_pending, 0.0)
+
+    def test_compact_schedule_reamortizes_inside_the_projection(self):
+        compact_type = self.env['loan.manager.type'].create(self._prepare_loan_type_vals(
+            loan_name='Préstamo Compacto Reamortizable',
+            schedule_storage='compact',
+            reamortization_mode='keep_term',
+        ))
+        loan = self._create_disbursed_loan(loan_type_id=compact_type.id)
+        first = loan.next_repayment_id
+        first._register_payment(first._get_amount_due() + 1000.0, payment_date=fields.Date.today())
+
+        self.assertEqual(len(loan.loan_repayment_ids), 2)
+        projected = loan._get_projected_rows()
+        self.assertEqual(len(projected), 10)
+        self.assertEqual(projected[0]['sequence'], 3)
+        pending = loan.loan_repayment_ids.filtered(lambda repayment: repayment.status == 'pending')
+        self.assertAlmostEqual(
+            sum(pending.mapped('principal')) + loan.projected_principal,
+            loan.loan_amount - first.principal,
+            delta=0.05,
+        )
@@ -0,0 +1,42 @@
+from psycopg2 import IntegrityError
+
+from odoo.tests import tagged
+from odoo.tools import mute_logger
+
+from odoo.addons.tel_capp_lm.tests.common import LoanManagerCommon
+
+
+@tagged('post_install', '-at_install')
+class TestLoanTerms(LoanManagerCommon):
+
+    def test_unused_loan_type_can_be_deleted(self):
+        loan_type = self.env['loan.manager.type'].create(self._prepare_loan_type_vals(loan_name='Préstamo sin Uso'))
+        loan_type.interest_rate = 14.0
+        terms = loan_type.terms_ids
+        self.assertEqual(len(terms), 2)
+        loan_type.unlink()
+        self.assertFalse(terms.exists())
+
+    def test_used_loan_type_cannot_be_deleted(self):
+        loan_type = self.env['loan.manager.type'].create(self._prepare_loan_type_vals(loan_name='Préstamo en Uso'))
+        self.env['loan.manager.loan'].create({
+            'partner_id': self.partner.id,
+            'loan_type_id': loan_type.id,
+            'loan_amount': 5000.0,
+            'tenure': 12,
+        })
+        with self.assertRaises(IntegrityError), mute_logger('odoo.sql_db'), self.cr.savepoint():
+            loan_type.unlink()
+            loan_type.flush_recordset()
+
+    def test_next_version_follows_highest_snapshot(self):
+        loan_type = self.env['loan.manager.type'].create(self._prepare_loan_type_vals(loan_name='Préstamo Migrado'))
+        current = loan_type.terms_id
+        self.env['loan.manager.terms'].sudo().create(dict(
+            current._get_terms_values(),
+            loan_type_id=loan_type.id,
+            company_id=loan_type.company_id.id,
+            version=current.version + 1,
+        ))
+        loan_type.interest_rate = 15.0
+        self.assertEqual(loan_type.terms_id.version, current.version + 2)
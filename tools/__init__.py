@@ -0,0 +1,2 @@
+from . import amortization
+from . import instrumentation
@@ -0,0 +1,177 @@
+"""
+    DOCSTRING: Amortization engine responsible for building complete repayment schedules as arrays. It has no ORM
+    dependency so it can be used and benchmarked outside Odoo. NumPy is used when available, otherwise every
+    schedule is computed with plain Python.
+"""
+from collections import namedtuple
+
+from dateutil.relativedelta import relativedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PLAN_STEPS = {
+    'monthly': {'months': 1},
+    'biweekly': {'days': 14},
+    'weekly': {'days': 7},
+}
+
+
+class Schedule(namedtuple('Schedule', ['sequence', 'due_date', 'principal', 'interest', 'remaining_balance'])):
+    """
+        DOCSTRING: Schedule holds one list per installment column, every list having one item per installment.
+    """
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.sequence)
+
+    def rows(self):
+        for values in zip(*self):
+            yield dict(zip(self._fields, values))
+
+
+def period_rate(annual_rate, periods_per_year=12):
+    return ((annual_rate or 0.0) / 100.0) / periods_per_year
+
+
+def due_dates(start_date, periods, plan='monthly', first=1):
+    step = PLAN_STEPS.get(plan) or PLAN_STEPS['monthly']
+    return [start_date + relativedelta(**{unit: value * i for unit, value in step.items()})
+            for i in range(first, first + periods)]
+
+
+def _amortize_python(principal, periods, rate, method):
+    capitals, interests, balances = [], [], []
+    remaining = principal
+    if method == 'german' or rate == 0:
+        payment = principal / periods
+    else:
+        payment = (principal * rate) / (1 - (1 + rate) ** (-periods))
+    for _i in range(periods):
+        interest = remaining * rate
+        capital = payment if method == 'german' else payment - interest
+        remaining = max(0.0, remaining - capital)
+        capitals.append(round(capital, 2))
+        interests.append(round(interest, 2))
+        balances.append(round(remaining, 2))
+    return capitals, interests, balances
+
+
+def _round_cents(values):
+    # np.round scales by 100 before rounding, which can disagree with round() right next to half a cent.
+    # Only those few ambiguous values are rounded again with round() so both backends return the same cents.
+    rounded = np.round(values, 2)
+    scaled = values * 100.0
+    ambiguous = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if ambiguous.any():
+        rounded[ambiguous] = [round(value, 2) for value in values[ambiguous].tolist()]
+    return rounded
+
+
+def _amortize_numpy(principals, periods, rates, method):
+    remaining = np.asarray(principals, dtype=float)
+    rates = np.asarray(rates, dtype=float)
+    if method == 'german':
+        payment = remaining / periods
+    else:
+        safe_rates = np.where(rates == 0, 1.0, rates)
+        payment = np.where(rates == 0, remaining / periods,
+                           (remaining * safe_rates) / (1 - (1 + safe_rates) ** (-periods)))
+    capital = np.empty((periods, remaining.shape[0]))
+    interest = np.empty_like(capital)
+    balance = np.empty_like(capital)
+    for i in range(periods):
+        interest[i] = remaining * rates
+        capital[i] = payment if method == 'german' else payment - interest[i]
+        remaining = np.maximum(0.0, remaining - capital[i])
+        balance[i] = remaining
+    return tuple(_round_cents(column.T).tolist() for column in (capital, interest, balance))
+
+
+def build_schedules(terms):
+    """
+        Builds one Schedule per item of terms, keeping the same order. Every item is a mapping with the keys
+        principal, periods, annual_rate, start_date and optionally method ('french' by default), plan
+        ('monthly' by default) and first_sequence (1 by default). Loans sharing the same number of periods and
+        method are computed together as a single matrix when NumPy is available.
+    """
+    terms = list(terms)
+    groups = {}
+    for index, term in enumerate(terms):
+        periods = term['periods']
+        if periods <= 0:
+            raise ValueError('The number of periods must be greater than zero.')
+        groups.setdefault((periods, term.get('method') or 'french'), []).append(index)
+
+    amounts = [None] * len(terms)
+    for (periods, method), indexes in groups.items():
+        principals = [terms[i]['principal'] or 0.0 for i in indexes]
+        rates = [period_rate(terms[i]['annual_rate']) for i in indexes]
+        if np is not None:
+            columns = _amortize_numpy(principals, periods, rates, method)
+            for position, index in enumerate(indexes):
+                amounts[index] = tuple(column[position] for column in columns)
+        else:
+            for index, principal, rate in zip(indexes, principals, rates):
+                amounts[index] = _amortize_python(principal, periods, rate, method)
+
+    dates_cache = {}
+    schedules = []
+    for term, (capitals, interests, balances) in zip(terms, amounts):
+        first = term.get('first_sequence') or 1
+        key = (term['start_date'], term['periods'], term.get('plan') or 'monthly')
+        if key not in dates_cache:
+            dates_cache[key] = due_dates(*key)
+        schedules.append(Schedule(
+            list(range(first, first + term['periods'])),
+            dates_cache[key],
+            capitals,
+            interests,
+            balances,
+        ))
+    return schedules
+
+
+def build_schedule(principal, periods, annual_rate, start_date, method='french', plan='monthly'):
+    return build_schedules([{
+        'principal': principal,
+        'periods': periods,
+        'annual_rate': annual_rate,
+        'start_date': start_date,
+        'method': method,
+        'plan': plan,
+    }])[0]
+
+
+def amortize(principal, periods, annual_rate, method='french'):
+    """
+        Returns the principal, interest and remaining balance columns of a single balance amortized over periods.
+    """
+    if periods <= 0:
+        raise ValueError('The number of periods must be greater than zero.')
+    return _amortize_python(principal, periods, period_rate(annual_rate), method)
+
+
+def amortize_fixed_installment(principal, installment, annual_rate, method='french'):
+    """
+        Returns the principal, interest and remaining balance columns of a balance paid with a fixed installment
+        (a fixed principal part for the German method), using as many periods as needed. The last installment
+        only covers what is left of the balance.
+    """
+    rate = period_rate(annual_rate)
+    capitals, interests, balances = [], [], []
+    remaining = principal
+    while remaining >= 0.005:
+        interest = remaining * rate
+        capital = installment if method == 'german' else installment - interest
+        if capital < 0.005:
+            raise ValueError('The installment does not cover the interest of the balance.')
+        capital = min(capital, remaining)
+        remaining = max(0.0, remaining - capital)
+        capitals.append(round(capital, 2))
+        interests.append(round(interest, 2))
+        balances.append(round(remaining, 2))
+    return capitals, interests, balances
@@ -0,0 +1,33 @@
+"""
+    DOCSTRING: Opt-in instrumentation responsible for timing loan hot paths. Decorated methods record their duration,
+    SQL query count and record count in loan.manager.perf.log when the tel_capp_lm.perf_log_enabled system parameter
+    is set. When it is not, the only cost is a cached parameter lookup.
+"""
+import functools
+import time
+
+from odoo.tools import str2bool
+
+PERF_LOG_PARAMETER = 'tel_capp_lm.perf_log_enabled'
+
+
+def is_enabled(env):
+    return str2bool(env['ir.config_parameter'].sudo().get_param(PERF_LOG_PARAMETER, 'False'), False)
+
+
+def instrumented(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not is_enabled(self.env):
+            return method(self, *args, **kwargs)
+        cr = self.env.cr
+        record_count = len(self)
+        queries = cr.sql_log_count
+        start = time.perf_counter()
+        result = method(self, *args, **kwargs)
+        duration = time.perf_counter() - start
+        self.env['loan.manager.perf.log']._log_call(
+            self._name, method.__name__, duration, cr.sql_log_count - queries, record_count,
+        )
+        return result
+    return wrapper